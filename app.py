@@ -1,4 +1,4 @@
-from services.init import add_shadow, create_packshot, enhance_prompt, generate_hd_image, lifestyle_shot_by_image, lifestyle_shot_by_text
+from services.init import add_shadow, create_packshot, enhance_prompt, generate_hd_image, lifestyle_shot_by_image, lifestyle_shot_by_text, ImageSource
 import streamlit as st # pyright: ignore[reportMissingImports]
 import os
 from dotenv import load_dotenv # type: ignore
@@ -8,13 +8,20 @@ from services import (
 )
 from PIL import Image
 import io
-import requests
 import json
-import time
 import base64
 from streamlit_drawable_canvas import st_canvas # pyright: ignore[reportMissingImports]
-import numpy as np # pyright: ignore[reportMissingImports]
 from services.erase_foreground import erase_foreground
+from services.log import get_logger, log_event
+from services.metrics import start_metrics_server
+from services.result_cache import get_result_cache
+from services.thumbnails import get_thumbnail, image_file_type
+from services.filters import apply_filters, filter_image, PRESETS as FILTER_PRESETS
+from services.masks import canvas_mask, encode_mask, has_strokes
+from services.backgrounds import get_canvas_background
+from services.poller import get_poller, PENDING, EXPIRED
+from services.tracing import traced
+import logging
 
 # Configure Streamlit page
 st.set_page_config(
@@ -25,15 +32,17 @@ st.set_page_config(
 )
 
 # Load environment variables
-print("Loading environment variables...")
-load_dotenv(verbose=True)  # Add verbose=True to see loading details
+load_dotenv()
 
-# Debug: Print environment variable status
-api_key = os.getenv("BRIA_API_KEY")
-print(f"API Key present: {bool(api_key)}")
-print(f"API Key value: {api_key if api_key else 'Not found'}")
-print(f"Current working directory: {os.getcwd()}")
-print(f".env file exists: {os.path.exists('.env')}")
+# Log environment status (never the key itself)
+logger = get_logger("app")
+log_event(logger, logging.DEBUG, "environment_loaded",
+          api_key_present=bool(os.getenv("BRIA_API_KEY")),
+          cwd=os.getcwd(),
+          env_file=os.path.exists('.env'))
+
+# Expose /metrics and /metrics.json when BRIA_METRICS_PORT is set
+start_metrics_server()
 
 def initialize_session_state():
     """Initialize session state variables."""
@@ -45,45 +54,69 @@ def initialize_session_state():
         st.session_state.current_image = None
     if 'pending_urls' not in st.session_state:
         st.session_state.pending_urls = []
+    if 'poll_job' not in st.session_state:
+        st.session_state.poll_job = None
     if 'edited_image' not in st.session_state:
         st.session_state.edited_image = None
     if 'original_prompt' not in st.session_state:
         st.session_state.original_prompt = ""
     if 'enhanced_prompt' not in st.session_state:
         st.session_state.enhanced_prompt = None
+    if 'optimize_uploads' not in st.session_state:
+        st.session_state.optimize_uploads = False
 
+@traced("download")
 def download_image(url: str) -> bytes | None:
-    """Download an image from a given URL and return raw bytes."""
+    """
+    Download an image from a given URL and return raw bytes.
+    Served from the shared result cache, so reruns do not download it again.
+    """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.content
+        image_bytes = get_result_cache().get(url)
+        if image_bytes is None:
+            st.warning("⏳ Image is not ready yet.")
+        return image_bytes
     except Exception as e:
         st.error(f"❌ Error downloading image: {e}")
         return None
 
+def show_result_image(url: str, caption: str, file_name: str, key: str | None = None) -> None:
+    """
+    Show a compact preview of a result image with full-resolution access.
+    The full image is only sent to the browser when it is opened or downloaded.
+    """
+    image_data = download_image(url)
+    if not image_data:
+        return
+    st.image(get_thumbnail(image_data), caption=caption, use_column_width=True)
+    st.markdown(f"[🔍 Open full resolution]({url})")
+    extension, mime = image_file_type(image_data)
+    st.download_button(
+        "⬇️ Download Result",
+        image_data,
+        f"{file_name}.{extension}",
+        mime,
+        key=key
+    )
+
 # -----------------------------
 # Utility: Apply Filters
 # -----------------------------
-def apply_image_filter(image, filter_type: str) -> Image.Image | None:
-    """Apply a selected filter to the image (bytes or PIL.Image)."""
+def apply_image_filter(image, filter_type: str, max_side: int | None = None) -> Image.Image | None:
+    """
+    Apply a selected filter to the image (bytes, file-like or PIL.Image).
+    Byte inputs are cached per image and filter; pass `max_side` for fast previews.
+    """
 
     try:
-        # Ensure we always work with a PIL image
-        img = Image.open(io.BytesIO(image)) if isinstance(image, bytes) else Image.open(image)
-
-        # Filter mappings
-        filters = {
-            "Grayscale": lambda im: im.convert("L"),
-            "Sepia": apply_sepia,
-            "High Contrast": lambda im: ImageEnhance.Contrast(im).enhance(1.5), # type: ignore
-            "Blur": lambda im: im.filter(ImageFilter.BLUR) # type: ignore
-        }
-
-        # Apply chosen filter if valid
-        if filter_type in filters:
-            return filters[filter_type](img)
-        return img
+        if filter_type not in FILTER_PRESETS:
+            return Image.open(io.BytesIO(image)) if isinstance(image, bytes) else Image.open(image)
+        chain = FILTER_PRESETS[filter_type]
+        if isinstance(image, bytes):
+            return filter_image(image, chain, max_side)
+        if not isinstance(image, Image.Image):
+            return filter_image(image.getvalue() if hasattr(image, "getvalue") else image.read(), chain, max_side)
+        return apply_filters(image, chain, max_side)
 
     except Exception as e:
         st.error(f"⚠️ Error applying filter ({filter_type}): {e}")
@@ -94,50 +127,39 @@ def apply_image_filter(image, filter_type: str) -> Image.Image | None:
 # -----------------------------
 def apply_sepia(image: Image.Image) -> Image.Image:
     """Apply a sepia tone effect to a PIL image."""
-    sepia = image.convert("RGB")
-    width, height = sepia.size
-    pixels = sepia.load()
-
-    for x in range(width):
-        for y in range(height):
-            r, g, b = pixels[x, y]
-            tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-            tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-            tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-            pixels[x, y] = (min(tr, 255), min(tg, 255), min(tb, 255))
+    return apply_filters(image, FILTER_PRESETS["Sepia"])
 
-    return sepia
+def set_pending_urls(urls: list) -> None:
+    """Start polling `urls` for an async job on the background poller."""
+    st.session_state.pending_urls = urls
+    st.session_state.poll_job = get_poller().submit(urls)
 
 def check_generated_images() -> bool:
     """
-    Check if any pending images in session_state are ready.
-    Updates session_state with ready and pending lists.
+    Collect the results the background poller has found ready.
+    Updates session_state with ready and pending lists without blocking.
     Returns True if at least one image is ready.
     """
-    if not st.session_state.get("pending_urls"):
+    job_id = st.session_state.get("poll_job")
+    if not job_id:
         return False
 
-    ready_images, still_pending = [], []
-
-    for url in st.session_state.pending_urls:
-        try:
-            response = requests.head(url, timeout=5)
-            if response.status_code == 200:
-                ready_images.append(url)
-            else:
-                still_pending.append(url)
-        except Exception as e:
-            still_pending.append(url)
+    status = get_poller().status(job_id)
+    if status is None or status["state"] != PENDING:
+        # Job finished (or was forgotten); stop tracking it after this read
+        st.session_state.poll_job = None
+        if status and status["state"] == EXPIRED and not status["ready"]:
+            st.warning("⚠️ No images became ready before the deadline. Please try again.")
 
     # Update state
-    st.session_state.pending_urls = still_pending
+    st.session_state.pending_urls = status["pending"] if status and status["state"] == PENDING else []
 
-    if ready_images:
+    if status and status["ready"]:
         # Show the first ready image as "edited"
-        st.session_state.edited_image = ready_images[0]
+        st.session_state.edited_image = status["ready"][0]
 
         # Store all ready images for later use
-        st.session_state.generated_images = ready_images
+        st.session_state.generated_images = status["ready"]
         return True
 
     return False
@@ -145,30 +167,49 @@ def check_generated_images() -> bool:
 # -----------------------------
 # Auto Check Images with UI Feedback
 # -----------------------------
-def auto_check_images(status_container, max_attempts: int = 3, delay: int = 2) -> bool:
+def auto_check_images(status_container) -> bool:
     """
-    Poll pending images up to `max_attempts` times with `delay` seconds between.
-    Shows live feedback in the given status_container.
-    Returns True if an image becomes ready.
+    Show the background poller's progress in the given status_container.
+    Returns True if an image is ready; never sleeps, the page is refreshed
+    by refresh_while_polling instead.
     """
-    for attempt in range(1, max_attempts + 1):
-        if not st.session_state.get("pending_urls"):
-            return False
+    if check_generated_images():
+        status_container.success("✨ Image is ready!")
+        return True
 
-        status_container.info(f"⏳ Checking for images... (Attempt {attempt}/{max_attempts})")
-        time.sleep(delay)
+    if st.session_state.get("poll_job"):
+        status_container.info("⏳ Generating... images will appear here as soon as they are ready.")
+    return False
 
-        if check_generated_images():
-            status_container.success("✨ Image is ready!")
-            return True
+def _poll_job_pending() -> bool:
+    job_id = st.session_state.get("poll_job")
+    status = get_poller().status(job_id) if job_id else None
+    return bool(status) and status["state"] == PENDING
+
+
+@st.fragment(run_every=1.0)
+def _watch_poll_job() -> None:
+    """Rerun the whole page once the pending job has finished."""
+    if not _poll_job_pending():
+        st.rerun()
 
-    status_container.warning("⚠️ No images became ready after multiple checks.")
-    return False
+
+def refresh_while_polling() -> None:
+    """
+    Refresh the page when a pending job's results arrive.
+
+    Called at the end of the script, after everything is rendered. A
+    fragment checks the poller every second on its own timer, so the
+    script thread never sleeps and widgets stay responsive while waiting.
+    """
+    if _poll_job_pending():
+        _watch_poll_job()
 
 
 def main():
     st.title("Studio")
     initialize_session_state()
+    check_generated_images()
     
     # Sidebar for API key
     with st.sidebar:
@@ -185,6 +226,12 @@ def main():
                 st.success("✅ API key loaded")
             else:
                 st.warning("⚠️ No API key provided")
+        with st.expander("⚡ Performance"):
+            st.session_state.optimize_uploads = st.checkbox(
+                "Optimize Uploads",
+                st.session_state.optimize_uploads,
+                help="Downscale large images to the size the output needs before uploading"
+            )
 
     # Main tabs
     tabs = st.tabs([
@@ -320,7 +367,7 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                st.image(uploaded_file, caption="Original Image", use_column_width=True)
+                st.image(get_thumbnail(uploaded_file.getvalue()), caption="Original Image", use_column_width=True)
                 
                 # Product editing options
                 edit_option = st.selectbox("Select Edit Option", [
@@ -350,28 +397,24 @@ def main():
                                         content_moderation=content_moderation
                                     )
                                     if bg_result and "result_url" in bg_result:
-                                        # Download the background-removed image
-                                        response = requests.get(bg_result["result_url"])
-                                        if response.status_code == 200:
-                                            image_data = response.content
-                                        else:
-                                            st.error("⚠️ Unable to download the background-removed image. Please try again.")
-                                            return
+                                        # Hand the hosted background-removed image straight to the packshot step
+                                        source = ImageSource(url=bg_result["result_url"])
                                     else:
                                         st.error("❌ Background removal was not successful. Check settings and retry.")
                                         return
                                 else:
-                                    image_data = uploaded_file.getvalue()
+                                    source = ImageSource(data=uploaded_file.getvalue())
+
 
-                                                                
                                 # Now create packshot
                                 result = create_packshot(
                                     st.session_state.api_key,
-                                    image_data,
                                     background_color=bg_color,
                                     sku=sku if sku else None,
                                     force_rmbg=force_rmbg,
-                                    content_moderation=content_moderation
+                                    content_moderation=content_moderation,
+                                    optimize_upload=st.session_state.optimize_uploads,
+                                    **source.kwargs()
                                 )
                                 
                                 if result and "result_url" in result:
@@ -427,7 +470,8 @@ def main():
                                 shadow_height=shadow_height if shadow_type == "Float" else 70,
                                 sku=sku if sku else None,
                                 force_rmbg=force_rmbg,
-                                content_moderation=content_moderation
+                                content_moderation=content_moderation,
+                                optimize_upload=st.session_state.optimize_uploads
                             )
                             
                             if result and "result_url" in result:
@@ -537,7 +581,8 @@ def main():
                                         foreground_image_location=[fg_x, fg_y] if placement_type == "Custom Coordinates" else None,
                                         force_rmbg=force_rmbg,
                                         content_moderation=content_moderation,
-                                        sku=sku if sku else None
+                                        sku=sku if sku else None,
+                                        optimize_upload=st.session_state.optimize_uploads
                                     )
                                     
                                     if result:
@@ -585,27 +630,17 @@ def main():
                                                     urls = urls[:num_results]
                                             
                                             if urls:
-                                                st.session_state.pending_urls = urls
+                                                set_pending_urls(urls)
                                                 
                                                 # Create a container for status messages
                                                 status_container = st.empty()
-                                                refresh_container = st.empty()
                                                 
                                                 # Show initial status
                                                 status_container.info(f"🎨 Generation started! Waiting for {len(urls)} image{'s' if len(urls) > 1 else ''}...")
                                                 
-                                                # Try automatic checking first
+                                                # Show background polling progress
                                                 if auto_check_images(status_container):
                                                     st.experimental_rerun()
-                                                
-                                                # Add refresh button for manual checking
-                                                if refresh_container.button("🔄 Check for Generated Images"):
-                                                    with st.spinner("Checking for completed images..."):
-                                                        if check_generated_images():
-                                                            status_container.success("✨ Image ready!")
-                                                            st.experimental_rerun()
-                                                        else:
-                                                            status_container.warning(f"⏳ Still generating your image{'s' if len(urls) > 1 else ''}... Please check again in a moment.")
                                 except Exception as e:
                                     st.error(f"Error: {str(e)}")
                                     if "422" in str(e):
@@ -638,7 +673,8 @@ def main():
                                         content_moderation=content_moderation,
                                         sku=sku if sku else None,
                                         enhance_ref_image=enhance_ref,
-                                        ref_image_influence=ref_influence
+                                        ref_image_influence=ref_influence,
+                                        optimize_upload=st.session_state.optimize_uploads
                                     )
                                     
                                     if result:
@@ -686,27 +722,17 @@ def main():
                                                     urls = urls[:num_results]
                                             
                                             if urls:
-                                                st.session_state.pending_urls = urls
+                                                set_pending_urls(urls)
                                                 
                                                 # Create a container for status messages
                                                 status_container = st.empty()
-                                                refresh_container = st.empty()
                                                 
                                                 # Show initial status
                                                 status_container.info(f"🎨 Generation started! Waiting for {len(urls)} image{'s' if len(urls) > 1 else ''}...")
                                                 
-                                                # Try automatic checking first
+                                                # Show background polling progress
                                                 if auto_check_images(status_container):
                                                     st.experimental_rerun()
-                                                
-                                                # Add refresh button for manual checking
-                                                if refresh_container.button("🔄 Check for Generated Images"):
-                                                    with st.spinner("Checking for completed images..."):
-                                                        if check_generated_images():
-                                                            status_container.success("✨ Image ready!")
-                                                            st.experimental_rerun()
-                                                        else:
-                                                            status_container.warning(f"⏳ Still generating your image{'s' if len(urls) > 1 else ''}... Please check again in a moment.")
                                 except Exception as e:
                                     st.error(f"Error: {str(e)}")
                                     if "422" in str(e):
@@ -714,17 +740,9 @@ def main():
             
             with col2:
                 if st.session_state.edited_image:
-                    st.image(st.session_state.edited_image, caption="Edited Image", use_column_width=True)
-                    image_data = download_image(st.session_state.edited_image)
-                    if image_data:
-                        st.download_button(
-                            "⬇️ Download Result",
-                            image_data,
-                            "edited_product.png",
-                            "image/png"
-                        )
+                    show_result_image(st.session_state.edited_image, "Edited Image", "edited_product")
                 elif st.session_state.pending_urls:
-                    st.info("Images are being generated. Click the refresh button above to check if they're ready.")
+                    st.info("Images are being generated. They will appear here as soon as they're ready.")
 
     # Generative Fill Tab
     with tabs[2]:
@@ -738,31 +756,22 @@ def main():
             
             with col1:
                 # Display original image
-                st.image(uploaded_file, caption="Original Image", use_column_width=True)
-                
-                # Get image dimensions for canvas
-                img = Image.open(uploaded_file)
-                img_width, img_height = img.size
-                
-                # Calculate aspect ratio and set canvas height
-                aspect_ratio = img_height / img_width
-                canvas_width = min(img_width, 800)  # Max width of 800px
-                canvas_height = int(canvas_width * aspect_ratio)
-                
-                # Resize image to match canvas dimensions
-                img = img.resize((canvas_width, canvas_height))
+                st.image(get_thumbnail(uploaded_file.getvalue()), caption="Original Image", use_column_width=True)
                 
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Convert to numpy array with proper shape and type
-                img_array = np.array(img).astype(np.uint8)
+                # Decoded, canvas-sized RGB background (max 800px wide), cached per upload
+                background = get_canvas_background(uploaded_file.getvalue())
+                img = background.image
+                img_width, img_height = background.source_size
+                canvas_width, canvas_height = background.canvas_size
                 
                 # Add drawing canvas using Streamlit's drawing canvas component
                 stroke_width = st.slider("Brush width", 1, 50, 20)
                 stroke_color = st.color_picker("Brush color", "#fff")
                 drawing_mode = "freedraw"
+                mask_grow = st.slider("Grow mask (px)", 0, 50, 0,
+                    help="Expand the painted area on the full-resolution mask")
+                mask_feather = st.slider("Feather mask edge (px)", 0, 30, 0,
+                    help="Soften the mask edge; 0 keeps a hard edge")
                 
                 # Create canvas with background image
                 canvas_result = st_canvas(
@@ -771,7 +780,7 @@ def main():
                     stroke_color=stroke_color,
                     drawing_mode=drawing_mode,
                     background_color="",  # Transparent background
-                    background_image=img if img_array.shape[-1] == 3 else None,  # Only pass RGB images
+                    background_image=img,  # Cached RGB background
                     height=canvas_height,
                     width=canvas_width,
                     key="canvas",
@@ -800,18 +809,21 @@ def main():
                         st.error("Please enter a prompt describing what to generate.")
                         return
                     
-                    if canvas_result.image_data is None:
+                    # Build the mask from the stroke alpha at the original image size
+                    mask_img = None
+                    if canvas_result.image_data is not None:
+                        mask_img = canvas_mask(
+                            canvas_result.image_data,
+                            (img_width, img_height),
+                            dilate=mask_grow,
+                            feather=mask_feather
+                        )
+                    if mask_img is None:
                         st.error("Please draw a mask on the image first.")
                         return
                     
-                    # Convert canvas result to mask
-                    mask_img = Image.fromarray(canvas_result.image_data.astype('uint8'), mode='RGBA')
-                    mask_img = mask_img.convert('L')
-                    
-                    # Convert mask to bytes
-                    mask_bytes = io.BytesIO()
-                    mask_img.save(mask_bytes, format='PNG')
-                    mask_bytes = mask_bytes.getvalue()
+                    # Convert mask to bytes (1-bit PNG unless feathered)
+                    mask_bytes = encode_mask(mask_img)
                     
                     # Convert uploaded image to bytes
                     image_bytes = uploaded_file.getvalue()
@@ -844,43 +856,26 @@ def main():
                                         st.success("✨ Generation complete!")
                                 else:
                                     if "urls" in result:
-                                        st.session_state.pending_urls = result["urls"][:num_results]
+                                        set_pending_urls(result["urls"][:num_results])
                                         
                                         # Create containers for status
                                         status_container = st.empty()
-                                        refresh_container = st.empty()
                                         
                                         # Show initial status
                                         status_container.info(f"🎨 Generation started! Waiting for {len(st.session_state.pending_urls)} image{'s' if len(st.session_state.pending_urls) > 1 else ''}...")
                                         
-                                        # Try automatic checking
+                                        # Show background polling progress
                                         if auto_check_images(status_container):
                                             st.rerun()
-                                        
-                                        # Add refresh button
-                                        if refresh_container.button("🔄 Check for Generated Images"):
-                                            if check_generated_images():
-                                                status_container.success("✨ Images ready!")
-                                                st.rerun()
-                                            else:
-                                                status_container.warning("⏳ Still generating... Please check again in a moment.")
                         except Exception as e:
                             st.error(f"Error: {str(e)}")
                             st.write("Full error details:", str(e))
             
             with col2:
                 if st.session_state.edited_image:
-                    st.image(st.session_state.edited_image, caption="Generated Result", use_column_width=True)
-                    image_data = download_image(st.session_state.edited_image)
-                    if image_data:
-                        st.download_button(
-                            "⬇️ Download Result",
-                            image_data,
-                            "generated_fill.png",
-                            "image/png"
-                        )
+                    show_result_image(st.session_state.edited_image, "Generated Result", "generated_fill")
                 elif st.session_state.pending_urls:
-                    st.info("Generation in progress. Click the refresh button above to check status.")
+                    st.info("Generation in progress. The result will appear here as soon as it's ready.")
 
     # Erase Elements Tab
     with tabs[3]:
@@ -893,23 +888,13 @@ def main():
             
             with col1:
                 # Display original image
-                st.image(uploaded_file, caption="Original Image", use_column_width=True)
+                st.image(get_thumbnail(uploaded_file.getvalue()), caption="Original Image", use_column_width=True)
                 
-                # Get image dimensions for canvas
-                img = Image.open(uploaded_file)
-                img_width, img_height = img.size
-                
-                # Calculate aspect ratio and set canvas height
-                aspect_ratio = img_height / img_width
-                canvas_width = min(img_width, 800)  # Max width of 800px
-                canvas_height = int(canvas_width * aspect_ratio)
-                
-                # Resize image to match canvas dimensions
-                img = img.resize((canvas_width, canvas_height))
-                
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
+                # Decoded, canvas-sized RGB background (max 800px wide), cached per upload
+                background = get_canvas_background(uploaded_file.getvalue())
+                img = background.image
+                img_width, img_height = background.source_size
+                canvas_width, canvas_height = background.canvas_size
                 
                 # Add drawing canvas using Streamlit's drawing canvas component
                 stroke_width = st.slider("Brush width", 1, 50, 20, key="erase_brush_width")
@@ -933,13 +918,9 @@ def main():
                 content_moderation = st.checkbox("Enable Content Moderation", False, key="erase_content_mod")
                 
                 if st.button("🎨 Erase Selected Area", key="erase_btn"):
-                    if not canvas_result.image_data is None:
+                    if has_strokes(canvas_result.image_data):
                         with st.spinner("Erasing selected area..."):
                             try:
-                                # Convert canvas result to mask
-                                mask_img = Image.fromarray(canvas_result.image_data.astype('uint8'), mode='RGBA')
-                                mask_img = mask_img.convert('L')
-                                
                                 # Convert uploaded image to bytes
                                 image_bytes = uploaded_file.getvalue()
                                 
@@ -964,16 +945,8 @@ def main():
             
             with col2:
                 if st.session_state.edited_image:
-                    st.image(st.session_state.edited_image, caption="Result", use_column_width=True)
-                    image_data = download_image(st.session_state.edited_image)
-                    if image_data:
-                        st.download_button(
-                            "⬇️ Download Result",
-                            image_data,
-                            "erased_image.png",
-                            "image/png",
-                            key="erase_download"
-                        )
+                    show_result_image(st.session_state.edited_image, "Result", "erased_image", key="erase_download")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
+    refresh_while_polling() 
\ No newline at end of file
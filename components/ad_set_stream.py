@@ -0,0 +1,70 @@
+import streamlit as st
+from services.result_cache import get_result_cache
+from services.thumbnails import get_thumbnail
+
+STAGE_LABELS = {
+    "hd_image": "🖼️ HD Image",
+    "packshot": "📦 Packshot",
+    "shadow": "🌑 Shadow",
+    "lifestyle": "🏞️ Lifestyle Shot",
+}
+
+# -----------------------------
+# Utility
+# -----------------------------
+def _show_stage_images(urls: list[str], label: str) -> None:
+    """Show the previews of one stage's results, or a note for those still rendering."""
+    cols = st.columns(min(3, len(urls)))
+    for idx, url in enumerate(urls):
+        with cols[idx % len(cols)]:
+            try:
+                image_bytes = get_result_cache().get(url)
+            except Exception as e:
+                st.warning(f"⚠️ Could not download image: {e}")
+                continue
+            if image_bytes:
+                st.image(get_thumbnail(image_bytes), caption=f"{label} {idx + 1}", use_container_width=True)
+                st.markdown(f"[🔍 Open full resolution]({url})")
+            else:
+                st.info(f"⏳ Still rendering: [result {idx + 1}]({url})")
+
+# -----------------------------
+# Main Renderer
+# -----------------------------
+def render_ad_set_stream(events) -> dict:
+    """
+    Render ad set stages as they complete.
+
+    `events` is the iterator returned by workflows.generate_ad_set.iter_ad_set;
+    each stage gets its own section as soon as its event arrives, so fast
+    stages are visible while slow ones are still running.
+
+    Returns:
+        The collected results keyed by stage name, plus `errors` if any stage failed
+    """
+
+    st.markdown("## 🖼️ Ad Set")
+    progress = st.empty()
+    progress.info("⏳ Generating ad set...")
+
+    results, errors = {}, {}
+    for event in events:
+        label = STAGE_LABELS.get(event["stage"], event["stage"])
+        if event["status"] == "succeeded":
+            results[event["stage"]] = event["result"]
+            st.markdown(f"### {label} · {event['elapsed']:.1f}s")
+            if event["urls"]:
+                _show_stage_images(event["urls"], label)
+            else:
+                st.json(event["result"])
+        else:
+            errors[event["stage"]] = event["error"]
+            st.warning(f"{label}: {event['error']}")
+        progress.info(f"⏳ {len(results) + len(errors)} stage(s) finished...")
+
+    if errors:
+        progress.warning(f"⚠️ Ad set finished with {len(errors)} stage(s) not completed.")
+        results["errors"] = errors
+    else:
+        progress.success("✅ Ad set complete!")
+    return results
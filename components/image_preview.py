@@ -1,26 +1,39 @@
 import streamlit as st
-import requests
-from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.result_cache import get_result_cache
+from services.thumbnails import get_thumbnail, image_file_type
+
+# Maximum images fetched at the same time
+PREFETCH_WORKERS = 4
 
 # -----------------------------
 # Utility
 # -----------------------------
 def download_image(url: str) -> bytes | None:
-    """Download image from a given URL and return raw bytes, or None if failed."""
+    """Return image bytes for a URL from the shared result cache, or None if failed."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.content
+        return get_result_cache().get(url)
     except Exception as e:
         st.warning(f"⚠️ Could not download image: {e}")
         return None
 
+def _fetch_with_thumbnail(url: str) -> tuple[bytes | None, bytes | None]:
+    """Fetch an image and its preview; runs on the prefetch pool."""
+    image_bytes = get_result_cache().get(url)
+    if not image_bytes:
+        return None, None
+    return image_bytes, get_thumbnail(image_bytes)
+
 # -----------------------------
 # Main Renderer
 # -----------------------------
 def render_image_preview(result: dict) -> None:
-    """Render the generated images in a grid layout with download options."""
+    """
+    Render the generated images in a grid layout with download options.
+
+    All images are fetched concurrently and each grid cell is filled as soon
+    as its image arrives.
+    """
 
     if not result or "images" not in result or not result["images"]:
         st.error("🚫 No images available to display.")
@@ -32,42 +45,47 @@ def render_image_preview(result: dict) -> None:
     images = result["images"]
     num_cols = min(3, len(images))
     
-    rows = [images[i:i+num_cols] for i in range(0, len(images), num_cols)]
-
-    for row in rows:
+    # Lay out one placeholder per image, then fill them as downloads finish
+    slots = []
+    for start in range(0, len(images), num_cols):
+        row = images[start:start + num_cols]
         cols = st.columns(len(row))
-        for idx, (col, image_data) in enumerate(zip(cols, row), start=1):
-            with col:
-                # Ensure image data has a URL
-                if "url" not in image_data:
-                    st.error("❌ Invalid image data.")
-                    continue
-
-                image_bytes = download_image(image_data["url"])
-                if not image_bytes:
-                    st.error("❌ Failed to load image.")
-                    continue
+        for col, image_data in zip(cols, row):
+            slot = col.empty()
+            if "url" not in image_data:
+                slot.error("❌ Invalid image data.")
+            else:
+                slot.info("⏳ Loading image...")
+                slots.append((len(slots) + 1, slot, image_data["url"]))
 
-                # Display image
-                st.image(image_bytes, caption=f"✨ Image {idx}", use_container_width=True)
+    with ThreadPoolExecutor(max_workers=max(1, min(PREFETCH_WORKERS, len(slots)))) as pool:
+        futures = {pool.submit(_fetch_with_thumbnail, url): (idx, slot, url) for idx, slot, url in slots}
+        for future in as_completed(futures):
+            idx, slot, url = futures[future]
+            try:
+                image_bytes, thumbnail = future.result()
+            except Exception as e:
+                slot.warning(f"⚠️ Could not download image: {e}")
+                continue
+            if not image_bytes:
+                slot.error("❌ Failed to load image.")
+                continue
 
-                # Prepare PIL image for download
-                try:
-                    image = Image.open(io.BytesIO(image_bytes))
-                    img_byte_arr = io.BytesIO()
-                    image.save(img_byte_arr, format=image.format or "PNG")
-                    img_byte_arr = img_byte_arr.getvalue()
+            with slot.container():
+                # Display a compact preview; full resolution on open or download
+                st.image(thumbnail, caption=f"✨ Image {idx}", use_container_width=True)
+                st.markdown(f"[🔍 Open full resolution]({url})")
 
-                    # Download button
-                    st.download_button(
-                        label="💾 Download",
-                        data=img_byte_arr,
-                        file_name=f"adsnap_generated_{idx}.png",
-                        mime="image/png",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.warning(f"⚠️ Error preparing image for download: {e}")
+                # Serve the original bytes; no decode/re-encode needed
+                extension, mime = image_file_type(image_bytes)
+                st.download_button(
+                    label="💾 Download",
+                    data=image_bytes,
+                    file_name=f"adsnap_generated_{idx}.{extension}",
+                    mime=mime,
+                    use_container_width=True,
+                    key=f"preview_download_{idx}"
+                )
 
     # Show extra API details (excluding image blobs)
     with st.expander("🔍 Image Generation Metadata"):
@@ -1,20 +1,11 @@
 import streamlit as st
+from workflows.generate_ad_set import DEFAULT_CONFIG
 
 def get_config():
     """Render and return user configuration from sidebar settings."""
 
     # Default config values
-    config = {
-        "create_packshot": False,
-        "add_shadow": False,
-        "lifestyle_shot": False,
-        "background_color": "#FFFFFF",
-        "shadow_type": "natural",
-        "scene_description": "",
-        "num_results": 1,
-        "aspect_ratio": "1:1",
-        "sync": True,
-    }
+    config = dict(DEFAULT_CONFIG)
 
     # -------------------------------
     # Sidebar Layout
@@ -30,6 +21,10 @@ def get_config():
             index=0,
         )
         config["sync"] = st.checkbox("⏳ Wait for Results", True)
+        config["optimize_uploads"] = st.checkbox(
+            "⚡ Optimize Uploads", False,
+            help="Downscale large images to the output size before uploading"
+        )
 
     # 📦 Packshot
     with st.sidebar.expander("📦 Packshot Settings"):
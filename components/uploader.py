@@ -1,6 +1,7 @@
 import streamlit as st
 import magic
 import io
+from services.thumbnails import get_thumbnail
 
 # -----------------------------
 # Utility
@@ -43,7 +44,7 @@ def render_uploader():
 
     # Preview uploaded image
     st.image(
-        file_content,
+        get_thumbnail(file_content),
         caption=f"✅ Uploaded: {uploaded_file.name}",
         use_container_width=True
     )
@@ -0,0 +1,117 @@
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import io
+import os
+import threading
+from PIL import Image
+from .cache import SizedLRUCache
+from .tracing import span
+
+# Widest canvas the editing tabs draw on
+CANVAS_MAX_WIDTH = 800
+
+
+class CanvasBackground:
+    """
+    A decoded image sized for a drawing canvas.
+
+    Args:
+        image: RGB image at canvas size
+        source_size: (width, height) of the full-resolution upload
+    """
+
+    __slots__ = ('image', 'source_size')
+
+    def __init__(self, image: Image.Image, source_size: Tuple[int, int]):
+        self.image = image
+        self.source_size = source_size
+
+    @property
+    def canvas_size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.image.width * self.image.height * len(self.image.getbands())
+
+
+def decode_background(image_bytes: bytes, max_width: int = CANVAS_MAX_WIDTH) -> CanvasBackground:
+    """
+    Decode an upload into an RGB canvas background at most `max_width` wide.
+
+    JPEGs are decoded at a reduced scale when the canvas is much smaller than
+    the photo, so a large image is never fully decoded just to be shrunk.
+    """
+    with span("transform.canvas_background", bytes=len(image_bytes)):
+        img = Image.open(io.BytesIO(image_bytes))
+        source_size = img.size
+        width = min(source_size[0], max_width)
+        height = int(width * source_size[1] / source_size[0])
+        img.draft("RGB", (width, height))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.size != (width, height):
+            img = img.resize((width, height))
+        # Decode now: the cached image is shared across sessions and must not hold the file open
+        img.load()
+        return CanvasBackground(img, source_size)
+
+
+class CanvasBackgroundCache:
+    """
+    Canvas backgrounds keyed by the upload's content hash and canvas width.
+
+    Reruns caused by brush strokes or widget changes reuse the decoded
+    background instead of decoding and resizing the upload again. Least
+    recently used backgrounds are evicted once their decoded size exceeds
+    `max_bytes`.
+
+    Args:
+        max_bytes: Memory budget for decoded backgrounds
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lru = SizedLRUCache(max_bytes, sizeof=lambda background: background.nbytes)
+
+    def get(self, image_bytes: bytes, max_width: int = CANVAS_MAX_WIDTH) -> CanvasBackground:
+        """Return the canvas background of `image_bytes`, decoding it on first use."""
+        key = f"{hashlib.sha256(image_bytes).hexdigest()}_{max_width}"
+        background = self._lru.get(key)
+        if background is None:
+            background = decode_background(image_bytes, max_width)
+            self._lru.set(key, background)
+        return background
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory usage."""
+        return self._lru.stats()
+
+
+_backgrounds: Optional[CanvasBackgroundCache] = None
+_backgrounds_lock = threading.Lock()
+
+
+def get_canvas_background(image_bytes: bytes, max_width: int = CANVAS_MAX_WIDTH) -> CanvasBackground:
+    """
+    Return a cached canvas background from the process-wide CanvasBackgroundCache.
+
+    The memory budget is read from BRIA_CANVAS_CACHE_MB (default 128).
+    """
+    global _backgrounds
+    if _backgrounds is None:
+        with _backgrounds_lock:
+            if _backgrounds is None:
+                _backgrounds = CanvasBackgroundCache(
+                    max_bytes=int(float(os.getenv("BRIA_CANVAS_CACHE_MB", "128")) * 1024 * 1024)
+                )
+    return _backgrounds.get(image_bytes, max_width)
+
+
+__all__ = [
+    'CanvasBackground',
+    'CanvasBackgroundCache',
+    'decode_background',
+    'get_canvas_background',
+    'CANVAS_MAX_WIDTH'
+]
@@ -0,0 +1,262 @@
+from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "studio", "responses")
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of API responses.
+
+    Entries are JSON files named by the request hash, written atomically so
+    several processes can share one directory. Entries older than `max_age`
+    are treated as misses (hosted result URLs eventually expire) and the least
+    recently used entries are evicted once the cache grows past `max_bytes`.
+
+    Args:
+        directory: Directory holding the cache files
+        max_bytes: Size budget for all entries
+        max_age: Maximum entry age in seconds
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 24 * 60 * 60
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest access first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self) -> None:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def _forget(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _remove(self, key: str) -> None:
+        self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for `key`, or None on a miss."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+                if time.time() - stat.st_mtime > self.max_age:
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                self._forget(key)
+                self.misses += 1
+                return None
+
+            # Written by another process, or first access since start-up
+            if key not in self._index:
+                self._index[key] = stat.st_size
+                self._bytes += stat.st_size
+            self._index.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response under `key` and evict old entries if over budget."""
+        path = self._path(key)
+        encoded = json.dumps(value).encode("utf-8")
+
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError:
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(encoded)
+            self._bytes += len(encoded)
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                oldest = next(iter(self._index))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._index),
+                'bytes': self._bytes
+            }
+
+
+class TTLCache:
+    """
+    Bounded in-memory LRU cache whose entries expire after `ttl` seconds.
+
+    Args:
+        max_entries: Maximum number of entries kept
+        ttl: Entry lifetime in seconds
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60 * 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+class SizedLRUCache:
+    """
+    Thread-safe in-memory LRU cache bounded by the total size of its values.
+
+    Least recently used entries are evicted once the summed `sizeof` of all
+    values exceeds `max_bytes`; a value larger than the whole budget is not
+    stored.
+
+    Args:
+        max_bytes: Size budget for all values
+        sizeof: Returns the size of a value in bytes (default: len)
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> bool:
+        """Store `value` under `key` unless it is already cached or too large; return whether it was added."""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                return False
+            self._entries[key] = (size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            return True
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+
+__all__ = ['ResponseCache', 'TTLCache', 'SizedLRUCache', 'DEFAULT_CACHE_DIR']
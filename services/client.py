@@ -0,0 +1,531 @@
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from .retry import RetryPolicy, TokenBucket, THROTTLE_STATUSES, parse_retry_after
+from .concurrency import ConcurrencyGovernor, OK, THROTTLED, ERROR
+from .singleflight import SingleFlight, AsyncSingleFlight, request_key
+from .cache import ResponseCache, DEFAULT_CACHE_DIR
+from .payload import JSONBody
+from .log import get_logger, log_event, redact_payload, truncate
+from .tracing import span
+from .metrics import (
+    REQUEST_LATENCY, REQUESTS, REQUEST_ERRORS, REQUEST_RETRIES,
+    IN_FLIGHT, UPLOAD_BYTES, DOWNLOAD_BYTES, CACHE_HITS
+)
+
+DEFAULT_BASE_URL = "https://engine.prod.bria-api.com/v1"
+
+logger = get_logger("client")
+
+
+def _request_sent(error: Exception) -> bool:
+    """Return False if a transport error happened before the request reached the server."""
+    if isinstance(error, (requests.exceptions.ConnectTimeout, httpx.ConnectError,
+                          httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return False
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return not isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return True
+
+
+def _error_outcome(error: BaseException) -> str:
+    """Classify a transport error for the concurrency governor."""
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        return THROTTLED
+    return ERROR
+
+
+def _status_outcome(status: int) -> str:
+    """Classify a response status for the concurrency governor."""
+    if status in THROTTLE_STATUSES:
+        return THROTTLED
+    if status >= 500:
+        return ERROR
+    return OK
+
+
+def _retry_delay(
+    policy: RetryPolicy,
+    rate_limiter: TokenBucket,
+    path: str,
+    status: int,
+    headers,
+    attempt: int
+) -> Optional[float]:
+    """
+    Return how long to sleep before retrying a response, or None if it is final.
+
+    Throttling responses pause the shared rate limiter instead, so every caller
+    backs off together and the returned delay is 0.
+    """
+    if status < 400 or not policy.should_retry_status(path, status, attempt):
+        return None
+
+    retry_after = parse_retry_after(headers)
+    delay = retry_after if retry_after is not None else policy.backoff(attempt)
+    if status in THROTTLE_STATUSES:
+        rate_limiter.pause(delay)
+        return 0.0
+    return delay
+
+
+def _record_call(path: str, response, payload_bytes: int, started: float, attempt: int) -> None:
+    """Log and record metrics for a finished API call; the body is only read when logged."""
+    latency = time.monotonic() - started
+    failed = response.status_code >= 400
+    REQUEST_LATENCY.observe(latency, endpoint=path)
+    REQUESTS.inc(endpoint=path, status=response.status_code)
+    DOWNLOAD_BYTES.inc(len(response.content), endpoint=path)
+    if failed:
+        REQUEST_ERRORS.inc(endpoint=path, error=f"http_{response.status_code}")
+
+    fields = {
+        'endpoint': path,
+        'status': response.status_code,
+        'payload_bytes': payload_bytes,
+        'latency_ms': round(latency * 1000, 1),
+        'retries': attempt - 1
+    }
+    if failed and logger.isEnabledFor(logging.WARNING):
+        fields['body'] = truncate(response.text)
+    log_event(logger, logging.WARNING if failed else logging.INFO, "api_call", **fields)
+    if not failed and logger.isEnabledFor(logging.DEBUG):
+        log_event(logger, logging.DEBUG, "api_response", endpoint=path, body=truncate(response.text))
+
+
+def _record_failure(path: str, error: BaseException, started: float, attempt: int) -> None:
+    """Log and record metrics for an API call that failed without a response."""
+    latency = time.monotonic() - started
+    REQUEST_LATENCY.observe(latency, endpoint=path)
+    REQUEST_ERRORS.inc(endpoint=path, error=type(error).__name__)
+    log_event(logger, logging.WARNING, "api_call_failed", endpoint=path, error=type(error).__name__,
+              latency_ms=round(latency * 1000, 1), retries=attempt - 1)
+
+
+def _record_retry(path: str, attempt: int, delay: float, status: Optional[int] = None,
+                  error: Optional[BaseException] = None) -> None:
+    REQUEST_RETRIES.inc(endpoint=path)
+    reason = {'status': status} if error is None else {'error': type(error).__name__}
+    log_event(logger, logging.WARNING, "api_retry", endpoint=path, attempt=attempt,
+              delay_s=round(delay, 2), **reason)
+
+
+class BriaClient:
+    """
+    Thin HTTP client for the Bria API holding a keep-alive connection pool.
+
+    A single instance is meant to be shared by every caller in the process so
+    that repeated calls reuse open TCP/TLS connections instead of paying a new
+    handshake each time. Transient failures are retried according to
+    `retry_policy`, outbound requests pass through `rate_limiter` and every
+    attempt holds a slot from the per-endpoint `governor`.
+
+    Args:
+        base_url: Root URL all endpoint paths are joined to
+        pool_connections: Number of host pools to cache
+        pool_maxsize: Maximum number of connections kept open per host
+        retry_policy: Retry/backoff/timeout policy (default: RetryPolicy())
+        rate_limiter: Token bucket shared by all requests (default: unlimited,
+            but still honours server rate-limit signals)
+        governor: Adaptive per-endpoint concurrency limits
+        response_cache: On-disk cache for deterministic calls (None disables it)
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        pool_connections: int = 4,
+        pool_maxsize: int = 32,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        response_cache: Optional[ResponseCache] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.governor = governor or ConcurrencyGovernor()
+        self.response_cache = response_cache
+        self.single_flight = SingleFlight()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        """Return the absolute URL for an endpoint path."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def headers(self, api_key: str) -> Dict[str, str]:
+        """Return the request headers for the given API key."""
+        return {
+            'api_token': api_key,
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+
+    def post(
+        self,
+        path: str,
+        api_key: str,
+        data: Dict[str, Any],
+        cacheable: bool = False
+    ) -> Dict[str, Any]:
+        """
+        POST a JSON payload to an endpoint and return the decoded JSON response.
+
+        Image fields given as ImagePayload are base64-encoded while the body is
+        streamed. Identical requests already in flight (same endpoint, API key
+        and payload) share a single upstream call.
+
+        Args:
+            path: Endpoint path relative to the base URL
+            api_key: Bria AI API key
+            data: Request payload (JSON values or ImagePayload image fields)
+            cacheable: Whether the call is deterministic, so its response may
+                be served from and stored in the response cache
+        """
+        key = request_key(path, api_key, data)
+        cache = self.response_cache if cacheable else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                CACHE_HITS.inc(endpoint=path)
+                log_event(logger, logging.DEBUG, "api_cache_hit", endpoint=path)
+                return cached
+
+        def fetch() -> Dict[str, Any]:
+            IN_FLIGHT.inc(endpoint=path)
+            try:
+                with span(f"api.{path}", endpoint=path):
+                    result = self._send(path, api_key, data)
+            finally:
+                IN_FLIGHT.dec(endpoint=path)
+            if cache is not None:
+                cache.set(key, result)
+            return result
+
+        return self.single_flight.do(key, fetch)
+
+    def _send(self, path: str, api_key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        url = self.url(path)
+        timeout = self.retry_policy.timeout_for(path)
+        if logger.isEnabledFor(logging.DEBUG):
+            log_event(logger, logging.DEBUG, "api_request", endpoint=path, payload=redact_payload(data))
+        call_started = time.monotonic()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            with span("api.queue", endpoint=path):
+                self.rate_limiter.acquire()
+                limiter = self.governor.limiter(path)
+                limiter.acquire()
+
+            with span("api.attempt", endpoint=path, attempt=attempt) as attempt_span:
+                started = time.monotonic()
+                try:
+                    body = JSONBody(data)
+                    UPLOAD_BYTES.inc(len(body), endpoint=path)
+                    response = self.session.post(url, headers=self.headers(api_key), data=body, timeout=timeout)
+                except BaseException as e:
+                    limiter.release(time.monotonic() - started, _error_outcome(e))
+                    if not isinstance(e, requests.exceptions.RequestException):
+                        raise
+                    if not self.retry_policy.should_retry_error(path, _request_sent(e), attempt):
+                        _record_failure(path, e, call_started, attempt)
+                        raise
+                    delay = self.retry_policy.backoff(attempt)
+                    _record_retry(path, attempt, delay, error=e)
+                    time.sleep(delay)
+                    continue
+                limiter.release(time.monotonic() - started, _status_outcome(response.status_code))
+                attempt_span.set(status=response.status_code)
+
+            delay = _retry_delay(self.retry_policy, self.rate_limiter, path,
+                                 response.status_code, response.headers, attempt)
+            if delay is None:
+                break
+            _record_retry(path, attempt, delay, status=response.status_code)
+            time.sleep(delay)
+
+        _record_call(path, response, len(body), call_started, attempt)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+
+class AsyncBriaClient:
+    """
+    Asyncio counterpart of BriaClient built on a pooled httpx.AsyncClient.
+
+    One instance lets a single event loop keep many API calls in flight over a
+    bounded set of keep-alive connections.
+
+    Args:
+        base_url: Root URL all endpoint paths are joined to
+        max_connections: Maximum number of concurrent connections
+        max_keepalive_connections: Maximum number of idle connections kept open
+        retry_policy: Retry/backoff/timeout policy (default: RetryPolicy())
+        rate_limiter: Token bucket shared by all requests
+        governor: Adaptive per-endpoint concurrency limits
+        response_cache: On-disk cache for deterministic calls (None disables it)
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        max_connections: int = 64,
+        max_keepalive_connections: int = 32,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        response_cache: Optional[ResponseCache] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.governor = governor or ConcurrencyGovernor()
+        self.response_cache = response_cache
+        self.single_flight = AsyncSingleFlight()
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            timeout=None
+        )
+        self.closed = False
+        # Async generator finalized at loop shutdown (see get_async_client)
+        self._closer = None
+
+    def url(self, path: str) -> str:
+        """Return the absolute URL for an endpoint path."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def headers(self, api_key: str) -> Dict[str, str]:
+        """Return the request headers for the given API key."""
+        return {
+            'api_token': api_key,
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+
+    async def post(
+        self,
+        path: str,
+        api_key: str,
+        data: Dict[str, Any],
+        cacheable: bool = False
+    ) -> Dict[str, Any]:
+        """
+        POST a JSON payload to an endpoint and return the decoded JSON response.
+
+        Identical requests already in flight on this event loop share a single
+        upstream call. See BriaClient.post for the arguments.
+        """
+        key = request_key(path, api_key, data)
+        cache = self.response_cache if cacheable else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                CACHE_HITS.inc(endpoint=path)
+                log_event(logger, logging.DEBUG, "api_cache_hit", endpoint=path)
+                return cached
+
+        async def fetch() -> Dict[str, Any]:
+            IN_FLIGHT.inc(endpoint=path)
+            try:
+                with span(f"api.{path}", endpoint=path):
+                    result = await self._send(path, api_key, data)
+            finally:
+                IN_FLIGHT.dec(endpoint=path)
+            if cache is not None:
+                cache.set(key, result)
+            return result
+
+        return await self.single_flight.do(key, fetch)
+
+    async def _send(self, path: str, api_key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        url = self.url(path)
+        connect_timeout, read_timeout = self.retry_policy.timeout_for(path)
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        if logger.isEnabledFor(logging.DEBUG):
+            log_event(logger, logging.DEBUG, "api_request", endpoint=path, payload=redact_payload(data))
+        call_started = time.monotonic()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            with span("api.queue", endpoint=path):
+                wait = self.rate_limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                limiter = self.governor.limiter(path)
+                await limiter.acquire_async()
+
+            with span("api.attempt", endpoint=path, attempt=attempt) as attempt_span:
+                started = time.monotonic()
+                try:
+                    body = JSONBody(data)
+                    UPLOAD_BYTES.inc(len(body), endpoint=path)
+                    headers = {**self.headers(api_key), 'Content-Length': str(len(body))}
+                    response = await self.session.post(url, headers=headers, content=body.achunks(), timeout=timeout)
+                except BaseException as e:
+                    limiter.release(time.monotonic() - started, _error_outcome(e))
+                    if not isinstance(e, httpx.TransportError):
+                        raise
+                    if not self.retry_policy.should_retry_error(path, _request_sent(e), attempt):
+                        _record_failure(path, e, call_started, attempt)
+                        raise
+                    delay = self.retry_policy.backoff(attempt)
+                    _record_retry(path, attempt, delay, error=e)
+                    await asyncio.sleep(delay)
+                    continue
+                limiter.release(time.monotonic() - started, _status_outcome(response.status_code))
+                attempt_span.set(status=response.status_code)
+
+            delay = _retry_delay(self.retry_policy, self.rate_limiter, path,
+                                 response.status_code, response.headers, attempt)
+            if delay is None:
+                break
+            _record_retry(path, attempt, delay, status=response.status_code)
+            await asyncio.sleep(delay)
+
+        _record_call(path, response, len(body), call_started, attempt)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        """Close all pooled connections (safe to call more than once)."""
+        if not self.closed:
+            self.closed = True
+            await self.session.aclose()
+
+
+_client: Optional[BriaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BriaClient:
+    """
+    Return the process-wide BriaClient, creating it on first use.
+
+    Configured from the environment:
+        BRIA_BASE_URL: API root URL
+        BRIA_RATE_LIMIT: Client-side request rate in requests per second (0 = off)
+        BRIA_CACHE: Set to 0 to disable the response cache
+        BRIA_CACHE_DIR, BRIA_CACHE_MAX_MB, BRIA_CACHE_MAX_AGE: Response cache
+            location, size budget and maximum entry age in seconds; the cache
+            is disabled when its directory cannot be created
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                response_cache = None
+                if os.getenv("BRIA_CACHE", "1") != "0":
+                    directory = os.getenv("BRIA_CACHE_DIR", DEFAULT_CACHE_DIR)
+                    try:
+                        response_cache = ResponseCache(
+                            directory=directory,
+                            max_bytes=int(float(os.getenv("BRIA_CACHE_MAX_MB", "256")) * 1024 * 1024),
+                            max_age=float(os.getenv("BRIA_CACHE_MAX_AGE", str(24 * 60 * 60)))
+                        )
+                    except OSError as e:
+                        # The cache is optional: without a writable directory, call the API directly
+                        log_event(logger, logging.WARNING, "response_cache_unavailable",
+                                  directory=directory, error=str(e))
+                _client = BriaClient(
+                    base_url=os.getenv("BRIA_BASE_URL", DEFAULT_BASE_URL),
+                    rate_limiter=TokenBucket(rate=float(os.getenv("BRIA_RATE_LIMIT", "0"))),
+                    response_cache=response_cache
+                )
+    return _client
+
+
+def set_client(client: BriaClient) -> None:
+    """
+    Replace the process-wide BriaClient (e.g. to point at another base URL).
+
+    The previous client and the async clients derived from it are closed.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+        stale = list(_async_clients.items())
+        _async_clients.clear()
+    if previous is not None and previous is not client:
+        previous.close()
+    for loop, async_client in stale:
+        # httpx clients must be closed on the loop that owns them
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(async_client.aclose(), loop)
+
+
+# httpx connections are bound to the event loop that opened them, so keep one
+# async client per running loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncBriaClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncBriaClient:
+    """
+    Return the AsyncBriaClient for the running event loop, creating it on first use.
+
+    Must be called from within a coroutine. The base URL, retry policy, rate
+    limiter, concurrency governor and response cache are shared with the
+    process-wide sync client, so limits apply across both.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        sync_client = get_client()
+        client = AsyncBriaClient(
+            base_url=sync_client.base_url,
+            retry_policy=sync_client.retry_policy,
+            rate_limiter=sync_client.rate_limiter,
+            governor=sync_client.governor,
+            response_cache=sync_client.response_cache
+        )
+        _async_clients[loop] = client
+        # Close the client's connections when the loop shuts down: asyncio.run()
+        # finalizes every live async generator before closing the loop
+        client._closer = _close_on_shutdown(client)
+        loop.create_task(client._closer.__anext__())
+    return client
+
+
+async def _close_on_shutdown(client: AsyncBriaClient):
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def aclose_async_client() -> None:
+    """Close the running loop's AsyncBriaClient now instead of at loop shutdown."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+__all__ = [
+    'BriaClient',
+    'AsyncBriaClient',
+    'get_client',
+    'set_client',
+    'get_async_client',
+    'aclose_async_client',
+    'DEFAULT_BASE_URL'
+]
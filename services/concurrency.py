@@ -0,0 +1,190 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+import asyncio
+import threading
+from .metrics import CONCURRENCY_LIMIT, CONCURRENCY_IN_FLIGHT
+
+# Outcomes reported back to a limiter when a request finishes
+OK = "ok"
+THROTTLED = "throttled"
+ERROR = "error"
+
+DEFAULT_LIMITS = {
+    "text-to-image": (2, 1, 16),
+    "product/lifestyle_shot": (2, 1, 16),
+    "gen_fill": (2, 1, 16),
+}
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one endpoint, usable from threads and coroutines.
+
+    The window grows by `increase / limit` for every healthy response (about
+    +`increase` per full window) and is multiplied by `decrease` on throttling
+    or timeouts. A response counts as healthy when its latency stays within
+    `latency_tolerance` times the fastest latency recently observed. The
+    window and slots in use are exported as the bria_concurrency_limit and
+    bria_concurrency_in_flight gauges.
+
+    Args:
+        name: Endpoint name, used in snapshots
+        initial: Starting concurrency limit
+        min_limit: Lower bound for the limit
+        max_limit: Upper bound for the limit
+        increase: Additive increase per window of healthy responses
+        decrease: Multiplicative decrease factor on throttling (0-1)
+        latency_tolerance: Allowed slowdown over the baseline latency
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(max(self.min_limit, min(initial, self.max_limit)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self.errors = 0
+        self.baseline_latency: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self._cond = threading.Condition()
+        self._async_waiters = deque()
+        self._publish()
+
+    def _publish(self) -> None:
+        CONCURRENCY_LIMIT.set(int(self.limit), endpoint=self.name)
+        CONCURRENCY_IN_FLIGHT.set(self.in_flight, endpoint=self.name)
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._publish()
+            return True
+        return False
+
+    def acquire(self) -> None:
+        """Block the calling thread until a slot is free."""
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until a slot is free."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, latency: float, outcome: str = OK) -> None:
+        """
+        Free a slot and adjust the limit from the request's outcome.
+
+        Args:
+            latency: Wall-clock seconds the request took
+            outcome: OK, THROTTLED (429/503/timeout) or ERROR (other failures)
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self.last_latency = latency
+
+            if outcome == THROTTLED:
+                self.throttles += 1
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            elif outcome == ERROR:
+                self.errors += 1
+            else:
+                self.successes += 1
+                # Let the baseline drift upwards slowly so it tracks real server speed
+                if self.baseline_latency is None or latency < self.baseline_latency:
+                    self.baseline_latency = latency
+                else:
+                    self.baseline_latency += (latency - self.baseline_latency) * 0.01
+                if latency <= self.baseline_latency * self.latency_tolerance:
+                    self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+            self._publish()
+            self._cond.notify_all()
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:
+                    pass  # the waiter's event loop has been closed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current window and counters."""
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'successes': self.successes,
+                'throttles': self.throttles,
+                'errors': self.errors,
+                'baseline_latency': self.baseline_latency,
+                'last_latency': self.last_latency
+            }
+
+
+def _wake(waiter: "asyncio.Future") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ConcurrencyGovernor:
+    """
+    Process-wide set of AdaptiveLimiters, one per endpoint path.
+
+    Args:
+        limits: Mapping of endpoint path prefix to (initial, min, max) limits
+        default_limits: (initial, min, max) for endpoints not in `limits`
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int, int]]] = None,
+        default_limits: Tuple[int, int, int] = (4, 1, 32)
+    ):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.default_limits = default_limits
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, path: str) -> AdaptiveLimiter:
+        """Return the limiter for an endpoint path, creating it on first use."""
+        path = path.lstrip("/")
+        with self._lock:
+            limiter = self._limiters.get(path)
+            if limiter is None:
+                initial, min_limit, max_limit = next(
+                    (limits for prefix, limits in self.limits.items() if path.startswith(prefix)),
+                    self.default_limits
+                )
+                limiter = AdaptiveLimiter(path, initial=initial, min_limit=min_limit, max_limit=max_limit)
+                self._limiters[path] = limiter
+            return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the current window and counters of every endpoint."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+__all__ = ['AdaptiveLimiter', 'ConcurrencyGovernor', 'OK', 'THROTTLED', 'ERROR']
@@ -0,0 +1,33 @@
+import time
+from .client import get_client
+from .metrics import REQUEST_LATENCY, REQUEST_ERRORS, DOWNLOAD_BYTES
+from .tracing import span
+
+
+def download_image(url: str, timeout: float = 30) -> bytes:
+    """
+    Download a result image over the shared keep-alive connection pool.
+
+    Args:
+        url: Image URL
+        timeout: Connect/read timeout in seconds
+
+    Returns:
+        Raw image bytes
+    """
+    with span("download", url=url) as download_span:
+        started = time.monotonic()
+        try:
+            response = get_client().session.get(url, timeout=timeout)
+            response.raise_for_status()
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint="download", error=type(e).__name__)
+            raise
+        finally:
+            REQUEST_LATENCY.observe(time.monotonic() - started, endpoint="download")
+        DOWNLOAD_BYTES.inc(len(response.content), endpoint="download")
+        download_span.set(bytes=len(response.content))
+        return response.content
+
+
+__all__ = ['download_image']
@@ -1,6 +1,29 @@
-from typing import Dict, Any, Optional
-import requests
-import base64
+from typing import Dict, Any, Optional, Tuple
+from .client import get_client, get_async_client
+from .payload import encode_image
+
+def _erase_foreground_request(
+    image_data: bytes = None,
+    image_url: str = None,
+    content_moderation: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the endpoint path and request data for an erase foreground call."""
+    path = "erase_foreground"
+
+    # Prepare request data
+    data = {
+        'content_moderation': content_moderation
+    }
+
+    # Add image data
+    if image_url:
+        data['image_url'] = image_url
+    elif image_data:
+        data['file'] = encode_image(image_data)
+    else:
+        raise ValueError("Either image_data or image_url must be provided")
+
+    return path, data
 
 def erase_foreground(
     api_key: str,
@@ -10,48 +33,41 @@ def erase_foreground(
 ) -> Dict[str, Any]:
     """
     Erase the foreground from an image and generate the area behind it.
-    
+
     Args:
         api_key: Bria AI API key
         image_data: Image data in bytes (optional if image_url provided)
         image_url: URL of the image (optional if image_data provided)
         content_moderation: Whether to enable content moderation
     """
-    url = "https://engine.prod.bria-api.com/v1/erase_foreground"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
-    
-    # Prepare request data
-    data = {
-        'content_moderation': content_moderation
-    }
-    
-    # Add image data
-    if image_url:
-        data['image_url'] = image_url
-    elif image_data:
-        data['file'] = base64.b64encode(image_data).decode('utf-8')
-    else:
-        raise ValueError("Either image_data or image_url must be provided")
-    
+    path, data = _erase_foreground_request(
+        image_data=image_data,
+        image_url=image_url,
+        content_moderation=content_moderation
+    )
+
+    try:
+        return get_client().post(path, api_key, data)
+    except Exception as e:
+        raise Exception(f"Erase foreground failed: {str(e)}")
+
+async def aerase_foreground(
+    api_key: str,
+    image_data: bytes = None,
+    image_url: str = None,
+    content_moderation: bool = False
+) -> Dict[str, Any]:
+    """Async counterpart of erase_foreground; accepts the same arguments."""
+    path, data = _erase_foreground_request(
+        image_data=image_data,
+        image_url=image_url,
+        content_moderation=content_moderation
+    )
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        print(f"Data: {data}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        return response.json()
+        return await get_async_client().post(path, api_key, data)
     except Exception as e:
         raise Exception(f"Erase foreground failed: {str(e)}")
 
 # Export the function
-__all__ = ['erase_foreground'] 
\ No newline at end of file
+__all__ = ['erase_foreground', 'aerase_foreground']
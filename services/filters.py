@@ -0,0 +1,215 @@
+from typing import Dict, Any, Optional, List, Tuple, Union, Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import json
+import numpy as np
+from PIL import Image
+from .cache import SizedLRUCache
+from .tracing import span
+
+# A filter chain is a sequence of (operation name, parameters) steps
+FilterStep = Tuple[str, Dict[str, Any]]
+FilterChain = Sequence[FilterStep]
+
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+], dtype=np.float32)
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _luma(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ LUMA_WEIGHTS
+
+
+def _sepia(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ SEPIA_MATRIX.T
+
+
+def _grayscale(rgb: np.ndarray) -> np.ndarray:
+    return np.repeat(_luma(rgb)[..., None], 3, axis=-1)
+
+
+def _contrast(rgb: np.ndarray, factor: float = 1.5) -> np.ndarray:
+    # Same definition as PIL's ImageEnhance.Contrast: scale around the mean gray level
+    mean = float(_luma(rgb).mean())
+    return (rgb - mean) * factor + mean
+
+
+def _brightness(rgb: np.ndarray, factor: float = 1.2) -> np.ndarray:
+    return rgb * factor
+
+
+def _saturation(rgb: np.ndarray, factor: float = 1.5) -> np.ndarray:
+    gray = _luma(rgb)[..., None]
+    return gray + (rgb - gray) * factor
+
+
+def _box_blur_axis(values: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    """Mean over a 2*radius+1 window along one axis using a running sum."""
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (radius + 1, radius)
+    sums = np.cumsum(np.pad(values, pad, mode="edge"), axis=axis, dtype=np.float32)
+    window = 2 * radius + 1
+    upper = np.take(sums, np.arange(window, sums.shape[axis]), axis=axis)
+    lower = np.take(sums, np.arange(0, sums.shape[axis] - window), axis=axis)
+    return (upper - lower) / window
+
+
+def _blur(rgb: np.ndarray, radius: int = 2, passes: int = 1) -> np.ndarray:
+    # Separable box blur; cost does not depend on the radius. Three passes
+    # closely approximate a Gaussian.
+    radius = int(radius)
+    if radius < 1:
+        return rgb
+    for _ in range(int(passes)):
+        rgb = _box_blur_axis(_box_blur_axis(rgb, radius, 0), radius, 1)
+    return rgb
+
+
+def _invert(rgb: np.ndarray) -> np.ndarray:
+    return 255.0 - rgb
+
+
+OPERATIONS: Dict[str, Callable[..., np.ndarray]] = {
+    'sepia': _sepia,
+    'grayscale': _grayscale,
+    'contrast': _contrast,
+    'brightness': _brightness,
+    'saturation': _saturation,
+    'blur': _blur,
+    'invert': _invert
+}
+
+# Named chains offered in the UI
+PRESETS: Dict[str, List[FilterStep]] = {
+    'Grayscale': [('grayscale', {})],
+    'Sepia': [('sepia', {})],
+    'High Contrast': [('contrast', {'factor': 1.5})],
+    'Blur': [('blur', {'radius': 2})],
+    'Vintage': [('sepia', {}), ('contrast', {'factor': 1.2}), ('blur', {'radius': 1})]
+}
+
+
+def chain_key(chain: FilterChain) -> str:
+    """Return a canonical string identifying a filter chain."""
+    return json.dumps([[name, params] for name, params in chain], sort_keys=True)
+
+
+def _to_image(image: Union[bytes, Image.Image]) -> Image.Image:
+    return Image.open(io.BytesIO(image)) if isinstance(image, (bytes, bytearray)) else image
+
+
+def apply_filters(
+    image: Union[bytes, Image.Image],
+    chain: FilterChain,
+    max_side: Optional[int] = None
+) -> Image.Image:
+    """
+    Apply a chain of filter operations to an image.
+
+    The image is converted to a float array once, every step runs as a
+    vectorized array operation on the RGB channels, and the result is
+    clipped and converted back once. Transparency is kept unchanged.
+
+    Args:
+        image: Image bytes or PIL image
+        chain: Steps such as [('sepia', {}), ('contrast', {'factor': 1.3})]
+        max_side: Downscale first so the longest side is at most this (for
+            fast interactive previews)
+
+    Returns:
+        The filtered PIL image
+    """
+    for name, _ in chain:
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown filter operation: {name}")
+
+    with span("transform.filter", chain=chain_key(chain)):
+        img = _to_image(image)
+        if max_side and max(img.size) > max_side:
+            if img is not image:
+                # Freshly opened from bytes, so JPEGs can decode at reduced scale
+                img.draft("RGB", (max_side, max_side))
+            img = img.copy()
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        array = np.asarray(img.convert("RGBA" if has_alpha else "RGB"))
+        rgb = array[..., :3].astype(np.float32)
+
+        for name, params in chain:
+            rgb = OPERATIONS[name](rgb, **params)
+
+        out = np.clip(rgb, 0, 255, out=rgb).astype(np.uint8)
+        if has_alpha:
+            out = np.dstack([out, array[..., 3]])
+        return Image.fromarray(out, "RGBA" if has_alpha else "RGB")
+
+
+class FilterCache:
+    """
+    Filtered images keyed by source image hash, filter chain and preview size.
+
+    Least recently used results are evicted once their decoded size exceeds
+    `max_bytes`.
+
+    Args:
+        max_bytes: Budget for cached images (width * height * channels)
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lru = SizedLRUCache(max_bytes, sizeof=lambda image: image.width * image.height * len(image.getbands()))
+
+    def filter(self, image_bytes: bytes, chain: FilterChain, max_side: Optional[int] = None) -> Image.Image:
+        """Return the filtered image, computing it only on the first request."""
+        key = f"{hashlib.sha256(image_bytes).hexdigest()}:{max_side}:{chain_key(chain)}"
+        result = self._lru.get(key)
+        if result is None:
+            result = apply_filters(image_bytes, chain, max_side)
+            self._lru.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return self._lru.stats()
+
+
+filter_cache = FilterCache()
+
+
+def filter_image(image_bytes: bytes, chain: FilterChain, max_side: Optional[int] = None) -> Image.Image:
+    """Apply `chain` to `image_bytes` through the process-wide FilterCache."""
+    return filter_cache.filter(image_bytes, chain, max_side)
+
+
+def filter_batch(
+    images: List[bytes],
+    chain: FilterChain,
+    max_side: Optional[int] = None,
+    max_workers: int = 4
+) -> List[Image.Image]:
+    """
+    Apply the same chain to several images in parallel, preserving order.
+
+    NumPy releases the GIL for the heavy array operations, so threads run
+    the filters concurrently.
+    """
+    if len(images) <= 1:
+        return [filter_image(image, chain, max_side) for image in images]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(images))) as pool:
+        return list(pool.map(lambda image: filter_image(image, chain, max_side), images))
+
+
+__all__ = [
+    'apply_filters',
+    'filter_image',
+    'filter_batch',
+    'FilterCache',
+    'chain_key',
+    'OPERATIONS',
+    'PRESETS'
+]
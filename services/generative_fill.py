@@ -1,6 +1,39 @@
-from typing import Dict, Any, Optional
-import requests
-import base64
+from typing import Dict, Any, Optional, Tuple
+from .client import get_client, get_async_client
+from .payload import encode_image
+
+def _generative_fill_request(
+    image_data: bytes,
+    mask_data: bytes,
+    prompt: str,
+    negative_prompt: Optional[str] = None,
+    num_results: int = 4,
+    sync: bool = False,
+    seed: Optional[int] = None,
+    content_moderation: bool = False,
+    mask_type: str = "manual"
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the endpoint path and request data for a generative fill call."""
+    path = "gen_fill"
+
+    # Prepare request data; image and mask are base64-encoded as the body is streamed
+    data = {
+        'file': encode_image(image_data),
+        'mask_file': encode_image(mask_data),
+        'mask_type': mask_type,
+        'prompt': prompt,
+        'num_results': num_results,
+        'sync': sync,
+        'content_moderation': content_moderation
+    }
+
+    # Add optional parameters
+    if negative_prompt:
+        data['negative_prompt'] = negative_prompt
+    if seed is not None:
+        data['seed'] = seed
+
+    return path, data
 
 def generative_fill(
     api_key: str,
@@ -12,11 +45,12 @@ def generative_fill(
     sync: bool = False,
     seed: Optional[int] = None,
     content_moderation: bool = False,
-    mask_type: str = "manual"
+    mask_type: str = "manual",
+    bypass_cache: bool = False
 ) -> Dict[str, Any]:
     """
     Generate content in a masked area of an image using a text prompt.
-    
+
     Args:
         api_key: Bria AI API key
         image_data: Image data in bytes
@@ -28,47 +62,52 @@ def generative_fill(
         seed: Optional seed for reproducible results
         content_moderation: Whether to enable content moderation
         mask_type: Type of mask ('manual' or 'automatic')
+        bypass_cache: Always call the API even when a seeded result is cached
     """
-    url = "https://engine.prod.bria-api.com/v1/gen_fill"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
-    
-    # Convert image and mask to base64
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
-    mask_base64 = base64.b64encode(mask_data).decode('utf-8')
-    
-    # Prepare request data
-    data = {
-        'file': image_base64,
-        'mask_file': mask_base64,
-        'mask_type': mask_type,
-        'prompt': prompt,
-        'num_results': num_results,
-        'sync': sync,
-        'content_moderation': content_moderation
-    }
-    
-    # Add optional parameters
-    if negative_prompt:
-        data['negative_prompt'] = negative_prompt
-    if seed is not None:
-        data['seed'] = seed
-    
+    path, data = _generative_fill_request(
+        image_data,
+        mask_data,
+        prompt,
+        negative_prompt=negative_prompt,
+        num_results=num_results,
+        sync=sync,
+        seed=seed,
+        content_moderation=content_moderation,
+        mask_type=mask_type
+    )
+
+    try:
+        return get_client().post(path, api_key, data, cacheable=seed is not None and not bypass_cache)
+    except Exception as e:
+        raise Exception(f"Generative fill failed: {str(e)}")
+
+async def agenerative_fill(
+    api_key: str,
+    image_data: bytes,
+    mask_data: bytes,
+    prompt: str,
+    negative_prompt: Optional[str] = None,
+    num_results: int = 4,
+    sync: bool = False,
+    seed: Optional[int] = None,
+    content_moderation: bool = False,
+    mask_type: str = "manual",
+    bypass_cache: bool = False
+) -> Dict[str, Any]:
+    """Async counterpart of generative_fill; accepts the same arguments."""
+    path, data = _generative_fill_request(
+        image_data,
+        mask_data,
+        prompt,
+        negative_prompt=negative_prompt,
+        num_results=num_results,
+        sync=sync,
+        seed=seed,
+        content_moderation=content_moderation,
+        mask_type=mask_type
+    )
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        print(f"Data: {data}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        return response.json()
+        return await get_async_client().post(path, api_key, data, cacheable=seed is not None and not bypass_cache)
     except Exception as e:
-        raise Exception(f"Generative fill failed: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Generative fill failed: {str(e)}")
@@ -0,0 +1,52 @@
+from typing import Dict, Any, Optional, Union
+from .download import download_image
+
+
+class ImageSource:
+    """
+    An image handed from one pipeline stage to the next.
+
+    Holds a hosted URL, raw bytes, or both. Stages whose endpoint accepts
+    `image_url` get the URL, so results are chained without downloading and
+    re-uploading them; bytes are only fetched (once) when a stage needs them.
+
+    Args:
+        data: Raw image bytes
+        url: URL of the hosted image
+    """
+
+    def __init__(self, data: Optional[bytes] = None, url: Optional[str] = None):
+        if data is None and not url:
+            raise ValueError("Either data or url must be provided")
+        self._data = data
+        self.url = url
+
+    @classmethod
+    def from_value(cls, image: Union[bytes, str, "ImageSource"]) -> "ImageSource":
+        """Wrap raw bytes or a URL string (ImageSource instances are returned as-is)."""
+        if isinstance(image, ImageSource):
+            return image
+        if isinstance(image, str):
+            return cls(url=image)
+        return cls(data=image)
+
+    @property
+    def data(self) -> bytes:
+        """Return the image bytes, downloading them on first access if only a URL is known."""
+        if self._data is None:
+            self._data = download_image(self.url)
+        return self._data
+
+    def kwargs(self, accepts_url: bool = True) -> Dict[str, Any]:
+        """
+        Return the image keyword arguments for a service function.
+
+        Args:
+            accepts_url: Whether the target function takes `image_url`
+        """
+        if accepts_url and self.url:
+            return {'image_url': self.url}
+        return {'image_data': self.data}
+
+
+__all__ = ['ImageSource']
@@ -1,10 +1,34 @@
-from .lifestyle_shot import lifestyle_shot_by_text, lifestyle_shot_by_image
-from .shadow import add_shadow
-from .packshot import create_packshot
-from .prompt_enhancement import enhance_prompt
-from .generative_fill import generative_fill
-from .image_generation import generate_hd_image
-from .erase_foreground import erase_foreground
+from .lifestyle_shot import (
+    lifestyle_shot_by_text,
+    lifestyle_shot_by_image,
+    alifestyle_shot_by_text,
+    alifestyle_shot_by_image
+)
+from .shadow import add_shadow, aadd_shadow
+from .packshot import create_packshot, acreate_packshot
+from .prompt_enhancement import enhance_prompt, aenhance_prompt, enhance_prompts, aenhance_prompts
+from .generative_fill import generative_fill, agenerative_fill
+from .image_generation import generate_hd_image, agenerate_hd_image
+from .erase_foreground import erase_foreground, aerase_foreground
+from .client import BriaClient, AsyncBriaClient, get_client, set_client, get_async_client, aclose_async_client
+from .retry import RetryPolicy, TokenBucket
+from .concurrency import AdaptiveLimiter, ConcurrencyGovernor
+from .cache import ResponseCache
+from .results import result_urls, first_result_url
+from .download import download_image
+from .image_source import ImageSource
+from .payload import ImagePayload, encode_image
+from .upload_optimizer import optimize_image, upload_stats
+from .log import configure_logging, get_logger
+from .metrics import MetricsRegistry, REGISTRY, start_metrics_server
+from .tracing import tracer, span, traced, enable_tracing, current_trace_id
+from .poller import ResultPoller, get_poller
+from .spool import ResultSpool, SpooledResult, fetch_result, get_spool
+from .result_cache import ResultImageCache, get_result_cache
+from .thumbnails import ThumbnailCache, get_thumbnail, make_thumbnail
+from .filters import apply_filters, filter_image, filter_batch
+from .masks import canvas_mask, encode_mask
+from .backgrounds import CanvasBackgroundCache, get_canvas_background
 
 __all__ = [
     'lifestyle_shot_by_text',
@@ -14,5 +38,62 @@ __all__ = [
     'enhance_prompt',
     'generative_fill',
     'generate_hd_image',
-    'erase_foreground'
-] 
\ No newline at end of file
+    'erase_foreground',
+    'alifestyle_shot_by_text',
+    'alifestyle_shot_by_image',
+    'aadd_shadow',
+    'acreate_packshot',
+    'aenhance_prompt',
+    'enhance_prompts',
+    'aenhance_prompts',
+    'agenerative_fill',
+    'agenerate_hd_image',
+    'aerase_foreground',
+    'BriaClient',
+    'AsyncBriaClient',
+    'get_client',
+    'set_client',
+    'get_async_client',
+    'aclose_async_client',
+    'RetryPolicy',
+    'TokenBucket',
+    'AdaptiveLimiter',
+    'ConcurrencyGovernor',
+    'ResponseCache',
+    'result_urls',
+    'first_result_url',
+    'download_image',
+    'ImageSource',
+    'ImagePayload',
+    'encode_image',
+    'optimize_image',
+    'upload_stats',
+    'configure_logging',
+    'get_logger',
+    'MetricsRegistry',
+    'REGISTRY',
+    'start_metrics_server',
+    'tracer',
+    'span',
+    'traced',
+    'enable_tracing',
+    'current_trace_id',
+    'ResultPoller',
+    'get_poller',
+    'ResultSpool',
+    'SpooledResult',
+    'fetch_result',
+    'get_spool',
+    'ResultImageCache',
+    'get_result_cache',
+    'ThumbnailCache',
+    'get_thumbnail',
+    'make_thumbnail',
+    'apply_filters',
+    'filter_image',
+    'filter_batch',
+    'canvas_mask',
+    'encode_mask',
+    'CanvasBackgroundCache',
+    'get_canvas_background'
+]
@@ -1,10 +1,182 @@
-from typing import Dict, Any, Optional, List
-import requests
-import base64
+from typing import Dict, Any, Optional, List, Tuple
+from .client import get_client, get_async_client
+from .payload import encode_image
+from .upload_optimizer import optimize_image, DEFAULT_MAX_SIDE
+
+def _add_placement_options(
+    data: Dict[str, Any],
+    placement_type: str,
+    shot_size: List[int],
+    manual_placement_selection: List[str],
+    padding_values: List[int],
+    foreground_image_size: Optional[List[int]],
+    foreground_image_location: Optional[List[int]],
+    sku: Optional[str]
+) -> None:
+    """Add the placement-dependent parameters shared by both lifestyle endpoints."""
+    if placement_type in ['automatic', 'manual_placement', 'custom_coordinates']:
+        data['shot_size'] = shot_size
+
+    if placement_type == 'manual_placement':
+        data['manual_placement_selection'] = manual_placement_selection
+
+    if placement_type == 'manual_padding':
+        data['padding_values'] = padding_values
+
+    if placement_type == 'custom_coordinates':
+        if foreground_image_size:
+            data['foreground_image_size'] = foreground_image_size
+        if foreground_image_location:
+            data['foreground_image_location'] = foreground_image_location
+
+    if sku:
+        data['sku'] = sku
+
+def _upload_max_side(
+    optimize_upload: bool,
+    original_quality: bool,
+    placement_type: str,
+    shot_size: List[int]
+) -> Optional[int]:
+    """Return the largest image side worth uploading, or None to upload as-is."""
+    if not optimize_upload or original_quality:
+        return None
+    if placement_type in ['automatic', 'manual_placement', 'custom_coordinates']:
+        return max(shot_size)
+    return DEFAULT_MAX_SIDE
+
+def _add_image(
+    data: Dict[str, Any],
+    image_data: Optional[bytes],
+    image_url: Optional[str],
+    max_side: Optional[int] = None,
+    preserve_alpha: bool = True
+) -> None:
+    """Add the product image, preferring an already hosted image over uploading bytes."""
+    if image_url:
+        data['image_url'] = image_url
+    elif image_data:
+        if max_side:
+            image_data = optimize_image(image_data, max_side=max_side, preserve_alpha=preserve_alpha)
+        data['file'] = encode_image(image_data)
+    else:
+        raise ValueError("Either image_data or image_url must be provided")
+
+def _lifestyle_by_text_request(
+    image_data: Optional[bytes],
+    scene_description: str,
+    placement_type: str = "original",
+    num_results: int = 4,
+    sync: bool = False,
+    fast: bool = True,
+    optimize_description: bool = True,
+    original_quality: bool = False,
+    exclude_elements: Optional[str] = None,
+    shot_size: List[int] = [1000, 1000],
+    manual_placement_selection: List[str] = ["upper_left"],
+    padding_values: List[int] = [0, 0, 0, 0],
+    foreground_image_size: Optional[List[int]] = None,
+    foreground_image_location: Optional[List[int]] = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    sku: Optional[str] = None,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the endpoint path and request data for a lifestyle shot by text call."""
+    path = "product/lifestyle_shot_by_text"
+
+    # Prepare request data
+    data = {
+        'scene_description': scene_description,
+        'placement_type': placement_type,
+        'num_results': num_results,
+        'sync': sync,
+        'fast': fast,
+        'optimize_description': optimize_description,
+        'original_quality': original_quality,
+        'force_rmbg': force_rmbg,
+        'content_moderation': content_moderation
+    }
+    max_side = _upload_max_side(optimize_upload, original_quality, placement_type, shot_size)
+    _add_image(data, image_data, image_url, max_side, preserve_alpha=not force_rmbg)
+
+    # Add optional parameters
+    if exclude_elements and not fast:
+        data['exclude_elements'] = exclude_elements
+
+    _add_placement_options(
+        data,
+        placement_type,
+        shot_size,
+        manual_placement_selection,
+        padding_values,
+        foreground_image_size,
+        foreground_image_location,
+        sku
+    )
+
+    return path, data
+
+def _lifestyle_by_image_request(
+    image_data: Optional[bytes],
+    reference_image: bytes,
+    placement_type: str = "original",
+    num_results: int = 4,
+    sync: bool = False,
+    original_quality: bool = False,
+    shot_size: List[int] = [1000, 1000],
+    manual_placement_selection: List[str] = ["upper_left"],
+    padding_values: List[int] = [0, 0, 0, 0],
+    foreground_image_size: Optional[List[int]] = None,
+    foreground_image_location: Optional[List[int]] = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    sku: Optional[str] = None,
+    enhance_ref_image: bool = True,
+    ref_image_influence: float = 1.0,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the endpoint path and request data for a lifestyle shot by image call."""
+    path = "product/lifestyle_shot_by_image"
+
+    max_side = _upload_max_side(optimize_upload, original_quality, placement_type, shot_size)
+    if max_side:
+        # The reference only guides the scene, so it never needs its alpha channel
+        reference_image = optimize_image(reference_image, max_side=max_side, preserve_alpha=False)
+
+    # Prepare request data
+    data = {
+        'ref_image_file': encode_image(reference_image),
+        'placement_type': placement_type,
+        'num_results': num_results,
+        'sync': sync,
+        'original_quality': original_quality,
+        'force_rmbg': force_rmbg,
+        'content_moderation': content_moderation,
+        'enhance_ref_image': enhance_ref_image,
+        'ref_image_influence': ref_image_influence
+    }
+    _add_image(data, image_data, image_url, max_side, preserve_alpha=not force_rmbg)
+
+    # Add optional parameters
+    _add_placement_options(
+        data,
+        placement_type,
+        shot_size,
+        manual_placement_selection,
+        padding_values,
+        foreground_image_size,
+        foreground_image_location,
+        sku
+    )
+
+    return path, data
 
 def lifestyle_shot_by_text(
     api_key: str,
-    image_data: bytes,
+    image_data: Optional[bytes],
     scene_description: str,
     placement_type: str = "original",
     num_results: int = 4,
@@ -20,14 +192,16 @@ def lifestyle_shot_by_text(
     foreground_image_location: Optional[List[int]] = None,
     force_rmbg: bool = False,
     content_moderation: bool = False,
-    sku: Optional[str] = None
+    sku: Optional[str] = None,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
 ) -> Dict[str, Any]:
     """
     Generate a lifestyle shot using text description.
-    
+
     Args:
         api_key: Bria AI API key
-        image_data: Image data in bytes
+        image_data: Image data in bytes (may be None if image_url provided)
         scene_description: Text description of the new scene
         placement_type: How to position the product ("original", "automatic", "manual_placement", "manual_padding", "custom_coordinates")
         num_results: Number of results to generate
@@ -44,72 +218,40 @@ def lifestyle_shot_by_text(
         force_rmbg: Whether to force background removal
         content_moderation: Whether to enable content moderation
         sku: Optional SKU identifier
+        image_url: URL of an already hosted product image, sent instead of image_data
+        optimize_upload: Downscale and re-encode image_data to the largest size
+            the requested shot needs before uploading it
     """
-    url = "https://engine.prod.bria-api.com/v1/product/lifestyle_shot_by_text"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
-    
-    # Convert image to base64
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
-    
-    # Prepare request data
-    data = {
-        'file': image_base64,
-        'scene_description': scene_description,
-        'placement_type': placement_type,
-        'num_results': num_results,
-        'sync': sync,
-        'fast': fast,
-        'optimize_description': optimize_description,
-        'original_quality': original_quality,
-        'force_rmbg': force_rmbg,
-        'content_moderation': content_moderation
-    }
-    
-    # Add optional parameters
-    if exclude_elements and not fast:
-        data['exclude_elements'] = exclude_elements
-    
-    if placement_type in ['automatic', 'manual_placement', 'custom_coordinates']:
-        data['shot_size'] = shot_size
-    
-    if placement_type == 'manual_placement':
-        data['manual_placement_selection'] = manual_placement_selection
-    
-    if placement_type == 'manual_padding':
-        data['padding_values'] = padding_values
-    
-    if placement_type == 'custom_coordinates':
-        if foreground_image_size:
-            data['foreground_image_size'] = foreground_image_size
-        if foreground_image_location:
-            data['foreground_image_location'] = foreground_image_location
-    
-    if sku:
-        data['sku'] = sku
-    
+    path, data = _lifestyle_by_text_request(
+        image_data,
+        scene_description,
+        placement_type=placement_type,
+        num_results=num_results,
+        sync=sync,
+        fast=fast,
+        optimize_description=optimize_description,
+        original_quality=original_quality,
+        exclude_elements=exclude_elements,
+        shot_size=shot_size,
+        manual_placement_selection=manual_placement_selection,
+        padding_values=padding_values,
+        foreground_image_size=foreground_image_size,
+        foreground_image_location=foreground_image_location,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        sku=sku,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        print(f"Data: {data}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        return response.json()
+        return get_client().post(path, api_key, data)
     except Exception as e:
         raise Exception(f"Lifestyle shot generation failed: {str(e)}")
 
 def lifestyle_shot_by_image(
     api_key: str,
-    image_data: bytes,
+    image_data: Optional[bytes],
     reference_image: bytes,
     placement_type: str = "original",
     num_results: int = 4,
@@ -124,67 +266,138 @@ def lifestyle_shot_by_image(
     content_moderation: bool = False,
     sku: Optional[str] = None,
     enhance_ref_image: bool = True,
-    ref_image_influence: float = 1.0
+    ref_image_influence: float = 1.0,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
 ) -> Dict[str, Any]:
     """
     Generate a lifestyle shot using a reference image.
+
+    The product image may be given as a hosted `image_url` instead of
+    `image_data`; the reference image is always uploaded. With
+    `optimize_upload`, both images are downscaled to the largest size the
+    requested shot needs before they are sent.
     """
-    url = "https://engine.prod.bria-api.com/v1/product/lifestyle_shot_by_image"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
-    
-    # Convert images to base64
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
-    reference_base64 = base64.b64encode(reference_image).decode('utf-8')
-    
-    # Prepare request data
-    data = {
-        'file': image_base64,
-        'ref_image_file': reference_base64,
-        'placement_type': placement_type,
-        'num_results': num_results,
-        'sync': sync,
-        'original_quality': original_quality,
-        'force_rmbg': force_rmbg,
-        'content_moderation': content_moderation,
-        'enhance_ref_image': enhance_ref_image,
-        'ref_image_influence': ref_image_influence
-    }
-    
-    # Add optional parameters
-    if placement_type in ['automatic', 'manual_placement', 'custom_coordinates']:
-        data['shot_size'] = shot_size
-    
-    if placement_type == 'manual_placement':
-        data['manual_placement_selection'] = manual_placement_selection
-    
-    if placement_type == 'manual_padding':
-        data['padding_values'] = padding_values
-    
-    if placement_type == 'custom_coordinates':
-        if foreground_image_size:
-            data['foreground_image_size'] = foreground_image_size
-        if foreground_image_location:
-            data['foreground_image_location'] = foreground_image_location
-    
-    if sku:
-        data['sku'] = sku
-    
+    path, data = _lifestyle_by_image_request(
+        image_data,
+        reference_image,
+        placement_type=placement_type,
+        num_results=num_results,
+        sync=sync,
+        original_quality=original_quality,
+        shot_size=shot_size,
+        manual_placement_selection=manual_placement_selection,
+        padding_values=padding_values,
+        foreground_image_size=foreground_image_size,
+        foreground_image_location=foreground_image_location,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        sku=sku,
+        enhance_ref_image=enhance_ref_image,
+        ref_image_influence=ref_image_influence,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
+    try:
+        return get_client().post(path, api_key, data)
+    except Exception as e:
+        raise Exception(f"Lifestyle shot generation failed: {str(e)}")
+
+async def alifestyle_shot_by_text(
+    api_key: str,
+    image_data: Optional[bytes],
+    scene_description: str,
+    placement_type: str = "original",
+    num_results: int = 4,
+    sync: bool = False,
+    fast: bool = True,
+    optimize_description: bool = True,
+    original_quality: bool = False,
+    exclude_elements: Optional[str] = None,
+    shot_size: List[int] = [1000, 1000],
+    manual_placement_selection: List[str] = ["upper_left"],
+    padding_values: List[int] = [0, 0, 0, 0],
+    foreground_image_size: Optional[List[int]] = None,
+    foreground_image_location: Optional[List[int]] = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    sku: Optional[str] = None,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
+) -> Dict[str, Any]:
+    """Async counterpart of lifestyle_shot_by_text; accepts the same arguments."""
+    path, data = _lifestyle_by_text_request(
+        image_data,
+        scene_description,
+        placement_type=placement_type,
+        num_results=num_results,
+        sync=sync,
+        fast=fast,
+        optimize_description=optimize_description,
+        original_quality=original_quality,
+        exclude_elements=exclude_elements,
+        shot_size=shot_size,
+        manual_placement_selection=manual_placement_selection,
+        padding_values=padding_values,
+        foreground_image_size=foreground_image_size,
+        foreground_image_location=foreground_image_location,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        sku=sku,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
+    try:
+        return await get_async_client().post(path, api_key, data)
+    except Exception as e:
+        raise Exception(f"Lifestyle shot generation failed: {str(e)}")
+
+async def alifestyle_shot_by_image(
+    api_key: str,
+    image_data: Optional[bytes],
+    reference_image: bytes,
+    placement_type: str = "original",
+    num_results: int = 4,
+    sync: bool = False,
+    original_quality: bool = False,
+    shot_size: List[int] = [1000, 1000],
+    manual_placement_selection: List[str] = ["upper_left"],
+    padding_values: List[int] = [0, 0, 0, 0],
+    foreground_image_size: Optional[List[int]] = None,
+    foreground_image_location: Optional[List[int]] = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    sku: Optional[str] = None,
+    enhance_ref_image: bool = True,
+    ref_image_influence: float = 1.0,
+    image_url: Optional[str] = None,
+    optimize_upload: bool = False
+) -> Dict[str, Any]:
+    """Async counterpart of lifestyle_shot_by_image; accepts the same arguments."""
+    path, data = _lifestyle_by_image_request(
+        image_data,
+        reference_image,
+        placement_type=placement_type,
+        num_results=num_results,
+        sync=sync,
+        original_quality=original_quality,
+        shot_size=shot_size,
+        manual_placement_selection=manual_placement_selection,
+        padding_values=padding_values,
+        foreground_image_size=foreground_image_size,
+        foreground_image_location=foreground_image_location,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        sku=sku,
+        enhance_ref_image=enhance_ref_image,
+        ref_image_influence=ref_image_influence,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        print(f"Data: {data}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        return response.json()
+        return await get_async_client().post(path, api_key, data)
     except Exception as e:
-        raise Exception(f"Lifestyle shot generation failed: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Lifestyle shot generation failed: {str(e)}")
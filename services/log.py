@@ -0,0 +1,141 @@
+from typing import Dict, Any, Optional
+import json
+import logging
+import os
+import sys
+import threading
+from .payload import ImagePayload
+from .tracing import current_trace_id
+
+ROOT_LOGGER = "studio"
+
+# Longest response/payload text written to the log before it is truncated
+DEFAULT_BODY_LIMIT = 512
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Render log records as one line of `event key=value ...` or as JSON.
+
+    Structured fields are passed with `extra={'fields': {...}}` (see
+    log_event) and rendered after the message.
+
+    Args:
+        fmt: "text" for key=value lines or "json" for one JSON object per line
+    """
+
+    def __init__(self, fmt: str = "text"):
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if self.json:
+            entry = {
+                'ts': round(record.created, 3),
+                'level': record.levelname.lower(),
+                'logger': record.name,
+                'event': record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """
+    Configure the `studio` logger hierarchy.
+
+    Called automatically on first use of get_logger; call it explicitly to
+    change the level or format at runtime.
+
+    Args:
+        level: Log level name (default: BRIA_LOG_LEVEL or "INFO")
+        fmt: "text" or "json" (default: BRIA_LOG_FORMAT or "text")
+    """
+    global _configured
+    with _configure_lock:
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel((level or os.getenv("BRIA_LOG_LEVEL", "INFO")).upper())
+        formatter = StructuredFormatter(fmt or os.getenv("BRIA_LOG_FORMAT", "text"))
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            logger.addHandler(handler)
+            logger.propagate = False
+        for handler in logger.handlers:
+            handler.setFormatter(formatter)
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger for a component, e.g. get_logger("client")."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """
+    Log `event` with structured fields; does nothing if `level` is disabled.
+
+    The active trace ID, if any, is added so log lines can be matched to spans.
+    """
+    if logger.isEnabledFor(level):
+        trace_id = current_trace_id()
+        if trace_id:
+            fields['trace_id'] = trace_id
+        logger.log(level, event, extra={'fields': fields})
+
+
+def body_limit() -> int:
+    """Return the configured maximum logged body length (BRIA_LOG_BODY_LIMIT)."""
+    return int(os.getenv("BRIA_LOG_BODY_LIMIT", str(DEFAULT_BODY_LIMIT)))
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    """Cut `text` to `limit` characters, noting how much was dropped."""
+    limit = body_limit() if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def redact_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a loggable summary of a request payload.
+
+    Image fields are replaced by their size and a short hash, long strings
+    are truncated and credential-like keys are masked.
+    """
+    summary = {}
+    for key, value in data.items():
+        if isinstance(value, ImagePayload):
+            summary[key] = f"<image {len(value)} bytes sha256:{value.digest[:12]}>"
+        elif any(secret in key.lower() for secret in ('key', 'token', 'secret')):
+            summary[key] = "***"
+        elif isinstance(value, str):
+            summary[key] = truncate(value, 120)
+        else:
+            summary[key] = value
+    return summary
+
+
+__all__ = [
+    'configure_logging',
+    'get_logger',
+    'log_event',
+    'truncate',
+    'redact_payload',
+    'StructuredFormatter'
+]
@@ -0,0 +1,282 @@
+from typing import Dict, Any, Optional, Tuple, List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import itertools
+import json
+import os
+import threading
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base for labelled metrics; values are keyed by the tuple of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or bytes sent."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value)
+                    for key, value in self._values.items()]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{'labels': dict(zip(self.labels, key)), 'value': value}
+                    for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. latencies.
+
+    Args:
+        name: Metric name
+        help_text: Description shown in the exposition
+        labels: Label names
+        buckets: Upper bounds of the buckets (an +Inf bucket is implied)
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state['counts']):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    samples.append((f"{self.name}_bucket", _format_labels(self.labels, key, le), cumulative))
+                samples.append((f"{self.name}_sum", _format_labels(self.labels, key), state['sum']))
+                samples.append((f"{self.name}_count", _format_labels(self.labels, key), state['count']))
+        return samples
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{
+                'labels': dict(zip(self.labels, key)),
+                'count': state['count'],
+                'sum': state['sum'],
+                'mean': state['sum'] / state['count'] if state['count'] else 0.0,
+                'buckets': dict(zip([_format_value(b) for b in self.buckets + (float("inf"),)],
+                                    itertools.accumulate(state['counts'])))
+            } for key, state in self._values.items()]
+
+
+class MetricsRegistry:
+    """
+    Collection of named metrics with Prometheus text and JSON exposition.
+
+    Metrics are created on first request and returned unchanged afterwards,
+    so modules can declare the metrics they use at import time.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def render_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serializable dict."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {'type': metric.kind, 'help': metric.help, 'values': metric.snapshot()}
+                for metric in metrics}
+
+
+REGISTRY = MetricsRegistry()
+
+# Service-layer metrics shared by the sync and async clients and downloads
+REQUEST_LATENCY = REGISTRY.histogram(
+    "bria_request_duration_seconds", "API call latency including retries", ("endpoint",))
+REQUESTS = REGISTRY.counter(
+    "bria_requests_total", "Completed API calls by final status", ("endpoint", "status"))
+REQUEST_ERRORS = REGISTRY.counter(
+    "bria_request_errors_total", "API calls that failed with an HTTP error or transport error",
+    ("endpoint", "error"))
+REQUEST_RETRIES = REGISTRY.counter(
+    "bria_request_retries_total", "Retried API attempts", ("endpoint",))
+IN_FLIGHT = REGISTRY.gauge(
+    "bria_requests_in_flight", "API calls currently in progress", ("endpoint",))
+UPLOAD_BYTES = REGISTRY.counter(
+    "bria_upload_bytes_total", "Request body bytes sent", ("endpoint",))
+DOWNLOAD_BYTES = REGISTRY.counter(
+    "bria_download_bytes_total", "Response and image bytes received", ("endpoint",))
+CACHE_HITS = REGISTRY.counter(
+    "bria_cache_hits_total", "API calls answered from the response cache", ("endpoint",))
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "bria_concurrency_limit", "Current AIMD concurrency window", ("endpoint",))
+CONCURRENCY_IN_FLIGHT = REGISTRY.gauge(
+    "bria_concurrency_in_flight", "Slots of the concurrency window in use", ("endpoint",))
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "bria_result_cache_lookups_total", "Result image lookups by the tier that served them", ("tier",))
+
+# Result polling metrics for async (non-sync) jobs
+POLL_CHECKS = REGISTRY.counter(
+    "bria_poll_checks_total", "Readiness checks of pending result URLs", ("result",))
+TIME_TO_FIRST_IMAGE = REGISTRY.histogram(
+    "bria_time_to_first_image_seconds", "Time from job submission until its first result is ready",
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(self.registry.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = self.registry.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a background thread.
+
+    Only one server is started per process; later calls return it. Without a
+    `port` argument, BRIA_METRICS_PORT is used and nothing is started if it is
+    unset.
+
+    Args:
+        port: TCP port to listen on
+        host: Interface to bind (local only by default)
+
+    Returns:
+        The running server, or None if no port is configured
+    """
+    global _server
+    if port is None:
+        port = int(os.getenv("BRIA_METRICS_PORT", "0")) or None
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+
+__all__ = [
+    'MetricsRegistry',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'REGISTRY',
+    'start_metrics_server'
+]
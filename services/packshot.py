@@ -1,63 +1,112 @@
-from typing import Dict, Any
-import requests
-import base64
+from typing import Dict, Any, Tuple
+from .client import get_client, get_async_client
+from .payload import encode_image
+from .upload_optimizer import optimize_image
+
+def _packshot_request(
+    image_data: bytes = None,
+    background_color: str = "#FFFFFF",
+    sku: str = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    image_url: str = None,
+    optimize_upload: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the endpoint path and request data for a packshot call."""
+    path = "product/packshot"
+
+    # Prepare request data
+    data = {
+        'background_color': background_color,
+        'force_rmbg': force_rmbg,
+        'content_moderation': content_moderation
+    }
+
+    # Add image data, preferring an already hosted image
+    if image_url:
+        data['image_url'] = image_url
+    elif image_data:
+        if optimize_upload:
+            # The alpha channel is the cutout unless background removal is forced
+            image_data = optimize_image(image_data, preserve_alpha=not force_rmbg)
+        data['file'] = encode_image(image_data)
+    else:
+        raise ValueError("Either image_data or image_url must be provided")
+
+    # Add optional SKU if provided
+    if sku:
+        data['sku'] = sku
+
+    return path, data
 
 def create_packshot(
     api_key: str,
-    image_data: bytes,
+    image_data: bytes = None,
     background_color: str = "#FFFFFF",
     sku: str = None,
     force_rmbg: bool = False,
-    content_moderation: bool = False
+    content_moderation: bool = False,
+    bypass_cache: bool = False,
+    image_url: str = None,
+    optimize_upload: bool = False
 ) -> Dict[str, Any]:
     """
     Create a professional packshot from a product image.
-    
+
     Args:
         api_key: Bria AI API key
-        image_data: Image data in bytes
+        image_data: Image data in bytes (optional if image_url provided)
         background_color: Background color in hex format or 'transparent'
         sku: Optional SKU identifier for the product
         force_rmbg: Whether to force background removal even if alpha channel exists
         content_moderation: Whether to enable content moderation
-    
+        bypass_cache: Always call the API instead of reusing a cached result
+            for the same image and settings
+        image_url: URL of an already hosted image, sent instead of image_data
+        optimize_upload: Downscale and re-encode image_data to the largest
+            size the packshot output needs before uploading it
+
     Returns:
         Dict containing the API response
     """
-    url = "https://engine.prod.bria-api.com/v1/product/packshot"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
-    
-    # Convert image data to base64
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
-    
-    # Prepare request data
-    data = {
-        'file': image_base64,
-        'background_color': background_color,
-        'force_rmbg': force_rmbg,
-        'content_moderation': content_moderation
-    }
-    
-    # Add optional SKU if provided
-    if sku:
-        data['sku'] = sku
-    
+    path, data = _packshot_request(
+        image_data,
+        background_color=background_color,
+        sku=sku,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
+    try:
+        return get_client().post(path, api_key, data, cacheable=not bypass_cache)
+    except Exception as e:
+        raise Exception(f"Packshot creation failed: {str(e)}")
+
+async def acreate_packshot(
+    api_key: str,
+    image_data: bytes = None,
+    background_color: str = "#FFFFFF",
+    sku: str = None,
+    force_rmbg: bool = False,
+    content_moderation: bool = False,
+    bypass_cache: bool = False,
+    image_url: str = None,
+    optimize_upload: bool = False
+) -> Dict[str, Any]:
+    """Async counterpart of create_packshot; accepts the same arguments."""
+    path, data = _packshot_request(
+        image_data,
+        background_color=background_color,
+        sku=sku,
+        force_rmbg=force_rmbg,
+        content_moderation=content_moderation,
+        image_url=image_url,
+        optimize_upload=optimize_upload
+    )
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        print(f"Data keys: {list(data.keys())}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        return response.json()
+        return await get_async_client().post(path, api_key, data, cacheable=not bypass_cache)
     except Exception as e:
-        raise Exception(f"Packshot creation failed: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Packshot creation failed: {str(e)}")
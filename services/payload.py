@@ -0,0 +1,202 @@
+from typing import Dict, Any, Iterator, List, Optional, Union
+from collections import OrderedDict
+import base64
+import hashlib
+import json
+import os
+import threading
+from .cache import SizedLRUCache
+
+# Raw bytes encoded per streamed chunk; a multiple of 3 so chunks concatenate
+# into valid base64 without padding in the middle.
+RAW_CHUNK_SIZE = 48 * 1024
+
+
+class ImagePayload:
+    """
+    Image bytes that are sent base64-encoded inside a JSON request body.
+
+    Holds a zero-copy view of the caller's bytes; the base64 text is produced
+    chunk by chunk while the body is streamed, so no full encoded copy of the
+    image is ever built for a one-off upload.
+
+    Args:
+        data: Raw image bytes (bytes, bytearray or memoryview)
+    """
+
+    __slots__ = ('view', '_digest')
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self.view = memoryview(data).cast('B')
+        self._digest: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self.view.nbytes
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the raw bytes, computed once."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.view).hexdigest()
+        return self._digest
+
+    @property
+    def encoded_length(self) -> int:
+        """Length of the base64 text."""
+        return 4 * ((self.view.nbytes + 2) // 3)
+
+    def chunks(self) -> Iterator[bytes]:
+        """Yield the base64 text in chunks, reusing a memoized encoding when available."""
+        encoded = _encodings.get(self)
+        if encoded is not None:
+            for start in range(0, len(encoded), RAW_CHUNK_SIZE):
+                yield bytes(encoded[start:start + RAW_CHUNK_SIZE])
+            return
+        for start in range(0, self.view.nbytes, RAW_CHUNK_SIZE):
+            yield base64.b64encode(self.view[start:start + RAW_CHUNK_SIZE])
+
+    def __repr__(self) -> str:
+        return f"<ImagePayload {self.view.nbytes} bytes>"
+
+
+class _EncodingCache:
+    """
+    Memoized base64 encodings keyed by image hash, bounded by total size.
+
+    An image's first upload is streamed without a full encoded copy. Once the
+    same bytes are sent a second time (e.g. packshot then lifestyle shot from
+    one upload) the encoding is kept here, so each further use is a slice.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._memory = SizedLRUCache(max_bytes)
+        self._lock = threading.Lock()
+
+    def get(self, image: ImagePayload) -> Optional[memoryview]:
+        digest = image.digest
+        encoded = self._memory.get(digest)
+        if encoded is not None:
+            return encoded
+        with self._lock:
+            if digest not in self._seen:
+                self._seen[digest] = None
+                while len(self._seen) > 4096:
+                    self._seen.popitem(last=False)
+                return None
+        if image.encoded_length > self.max_bytes:
+            return None
+
+        encoded = memoryview(base64.b64encode(image.view))
+        self._memory.set(digest, encoded)
+        return encoded
+
+
+_encodings = _EncodingCache(int(float(os.getenv("BRIA_ENCODE_CACHE_MB", "64")) * 1024 * 1024))
+
+
+def encode_image(data: Union[bytes, bytearray, memoryview]) -> ImagePayload:
+    """Wrap image bytes for a request field that expects base64 text."""
+    return ImagePayload(data)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ImagePayload):
+        return {'$image': value.digest}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def canonical_json(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize a payload canonically for hashing.
+
+    Image fields are represented by their digest, so hashing a request never
+    touches the base64 form of its images.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+class JSONBody:
+    """
+    File-like, streamable JSON request body for a flat payload dict.
+
+    Image fields (ImagePayload values) are encoded into the body as it is read.
+    The exact length is known up front, so requests and httpx send a normal
+    Content-Length body rather than a chunked one.
+
+    Args:
+        data: Request payload; values must be JSON-serializable or ImagePayload
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._segments: List[Union[bytes, ImagePayload]] = []
+        pending = [b"{"]
+        for index, (key, value) in enumerate(data.items()):
+            if index:
+                pending.append(b",")
+            pending.append(json.dumps(key).encode("utf-8") + b":")
+            if isinstance(value, ImagePayload):
+                pending.append(b'"')
+                self._segments.append(b"".join(pending))
+                self._segments.append(value)
+                pending = [b'"']
+            else:
+                pending.append(json.dumps(value).encode("utf-8"))
+        pending.append(b"}")
+        self._segments.append(b"".join(pending))
+
+        self._length = sum(
+            segment.encoded_length if isinstance(segment, ImagePayload) else len(segment)
+            for segment in self._segments
+        )
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _chunks(self) -> Iterator[bytes]:
+        for segment in self._segments:
+            if isinstance(segment, ImagePayload):
+                yield from segment.chunks()
+            elif segment:
+                yield segment
+
+    def __iter__(self) -> Iterator[bytes]:
+        self.seek(0)
+        return self._chunks()
+
+    async def achunks(self):
+        """Yield the body in chunks for an async HTTP client."""
+        for chunk in self._chunks():
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to `size` bytes of the body (all remaining bytes if negative)."""
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+        result = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(result)
+        return result
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Rewind the body; only seeking back to the start is supported."""
+        if offset != 0 or whence != os.SEEK_SET:
+            raise OSError("JSONBody can only be rewound to the start")
+        self._iterator = self._chunks()
+        self._buffer = bytearray()
+        self._position = 0
+        return 0
+
+
+__all__ = ['ImagePayload', 'JSONBody', 'encode_image', 'canonical_json']
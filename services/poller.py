@@ -0,0 +1,232 @@
+from typing import Dict, Any, Optional, List, Callable
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import random
+import threading
+import time
+import uuid
+from .log import get_logger, log_event
+from .metrics import POLL_CHECKS, TIME_TO_FIRST_IMAGE
+from .tracing import span
+from .spool import fetch_result
+
+logger = get_logger("poller")
+
+PENDING = "pending"
+DONE = "done"
+EXPIRED = "expired"
+CANCELLED = "cancelled"
+
+# Finished jobs are kept this long so a later rerun can still collect them
+FINISHED_JOB_TTL = 600.0
+
+
+class PollJob:
+    """
+    Pending result URLs of one async generation request.
+
+    Args:
+        urls: Result URLs returned by the API, in display order
+        deadline: Seconds after submission when the job gives up
+        interval: Initial delay before the first check
+    """
+
+    def __init__(self, urls: List[str], deadline: float, interval: float):
+        self.job_id = uuid.uuid4().hex
+        self.urls = list(urls)
+        self.pending = list(urls)
+        self.ready: List[str] = []
+        self.files: Dict[str, str] = {}
+        self.state = PENDING
+        self.submitted = time.time()
+        self.deadline = self.submitted + deadline
+        self.interval = interval
+        self.next_check = self.submitted + interval
+        self.checks = 0
+        self.first_ready_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'state': self.state,
+            'ready': [url for url in self.urls if url in self.ready],
+            'pending': list(self.pending),
+            'files': dict(self.files),
+            'checks': self.checks,
+            'submitted': self.submitted,
+            'first_ready_at': self.first_ready_at,
+            'next_check_in': max(0.0, self.next_check - time.time()) if self.state == PENDING else None
+        }
+
+
+class ResultPoller:
+    """
+    Background poller for the result URLs of async (non-sync) API jobs.
+
+    A single scheduler thread wakes when a job is due and checks all of its
+    pending URLs concurrently. The interval between checks grows
+    exponentially up to `max_interval` while nothing changes and drops back
+    to `initial_interval` whenever a result becomes ready, since the other
+    variants of a job usually follow shortly. Jobs still pending at their
+    deadline are marked expired. Callers read progress with `status` and are
+    never blocked.
+
+    By default a check is fetch_result, so a URL that turns out to be ready
+    is downloaded to the result spool in the same request and its local path
+    is reported in the job's `files`.
+
+    Args:
+        initial_interval: Delay before the first check and after progress
+        max_interval: Upper bound for the delay between checks
+        backoff: Factor the delay grows by after a check with no progress
+        deadline: Default seconds before a job gives up
+        max_workers: Maximum concurrent readiness checks
+        check: Function returning a truthy value when a URL is ready; a
+            result with a `path` attribute is recorded in `files`
+            (default: fetch_result)
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 1.0,
+        max_interval: float = 10.0,
+        backoff: float = 1.6,
+        deadline: float = 300.0,
+        max_workers: int = 8,
+        check: Optional[Callable[[str], Any]] = None
+    ):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.deadline = deadline
+        self.check = check or fetch_result
+        self._jobs: Dict[str, PollJob] = {}
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="result-poller")
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, urls: List[str], deadline: Optional[float] = None) -> str:
+        """Start polling `urls` and return the job ID."""
+        job = PollJob(urls, deadline if deadline is not None else self.deadline, self.initial_interval)
+        with self._cond:
+            self._jobs[job.job_id] = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="result-poller", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job.job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of a job's progress, or None if it is unknown."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def cancel(self, job_id: str) -> None:
+        """Stop polling a job."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job and job.state == PENDING:
+                self._finish(job, CANCELLED)
+
+    def _finish(self, job: PollJob, state: str) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        log_event(logger, logging.INFO, "poll_job_finished", job_id=job.job_id, state=state,
+                  ready=len(job.ready), pending=len(job.pending), checks=job.checks,
+                  elapsed_s=round(job.finished_at - job.submitted, 2))
+
+    def _due_jobs(self) -> List[PollJob]:
+        """Wait until at least one job is due and return the due jobs (lock held)."""
+        while True:
+            now = time.time()
+            for job_id, job in list(self._jobs.items()):
+                if job.state != PENDING and now - job.finished_at > FINISHED_JOB_TTL:
+                    del self._jobs[job_id]
+                elif job.state == PENDING and now >= job.deadline:
+                    self._finish(job, EXPIRED)
+
+            pending = [job for job in self._jobs.values() if job.state == PENDING]
+            due = [job for job in pending if job.next_check <= now]
+            if due:
+                return due
+            timeout = min((job.next_check for job in pending), default=now + 60) - now
+            self._cond.wait(timeout=max(timeout, 0.01))
+
+    def _check(self, url: str) -> Any:
+        try:
+            ready = self.check(url)
+            POLL_CHECKS.inc(result="ready" if ready else "pending")
+            return ready
+        except Exception as e:
+            POLL_CHECKS.inc(result="error")
+            log_event(logger, logging.DEBUG, "poll_check_failed", url=url, error=type(e).__name__)
+            return None
+
+    def _poll(self, jobs: List[PollJob]) -> None:
+        """Check every pending URL of the due jobs concurrently and reschedule them."""
+        checks = [(job, url) for job in jobs for url in list(job.pending)]
+        with span("poll.check", jobs=len(jobs), urls=len(checks)):
+            results = list(self._pool.map(self._check, [url for _, url in checks]))
+
+        with self._cond:
+            for job in jobs:
+                if job.state != PENDING:
+                    continue
+                job.checks += 1
+                newly_ready = []
+                for (owner, url), ready in zip(checks, results):
+                    if owner is job and ready:
+                        newly_ready.append(url)
+                        if getattr(ready, "path", None):
+                            job.files[url] = ready.path
+                if newly_ready:
+                    if job.first_ready_at is None:
+                        job.first_ready_at = time.time()
+                        TIME_TO_FIRST_IMAGE.observe(job.first_ready_at - job.submitted)
+                    job.ready.extend(newly_ready)
+                    job.pending = [url for url in job.pending if url not in newly_ready]
+                    job.interval = self.initial_interval
+                else:
+                    job.interval = min(job.interval * self.backoff, self.max_interval)
+
+                if not job.pending:
+                    self._finish(job, DONE)
+                else:
+                    jitter = random.uniform(0.9, 1.1)
+                    job.next_check = min(time.time() + job.interval * jitter, job.deadline)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._due_jobs()
+                # Push the due jobs out so they are not picked up again mid-check
+                for job in due:
+                    job.next_check = float("inf")
+            self._poll(due)
+
+
+_poller: Optional[ResultPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_poller() -> ResultPoller:
+    """Return the process-wide ResultPoller, creating it on first use."""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = ResultPoller()
+    return _poller
+
+
+__all__ = [
+    'ResultPoller',
+    'PollJob',
+    'get_poller',
+    'PENDING',
+    'DONE',
+    'EXPIRED',
+    'CANCELLED'
+]
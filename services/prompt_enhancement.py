@@ -1,48 +1,185 @@
-from typing import Dict, Any, Optional
-import requests
+from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
 import json
+import logging
+import os
+import threading
+from .client import get_client, get_async_client
+from .cache import ResponseCache, TTLCache, DEFAULT_CACHE_DIR
+from .singleflight import request_key
+from .log import get_logger, log_event
+
+logger = get_logger("prompt_enhancement")
+
+PROMPT_CACHE_TTL = float(os.getenv("BRIA_PROMPT_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
+# Enhancements are cached in memory for the life of the process and on disk
+# across restarts, both expiring after PROMPT_CACHE_TTL seconds.
+_memory_cache = TTLCache(max_entries=2048, ttl=PROMPT_CACHE_TTL)
+_disk_cache: Optional[ResponseCache] = None
+_disk_cache_unavailable = False
+_disk_cache_lock = threading.Lock()
+
+def _get_disk_cache() -> Optional[ResponseCache]:
+    """Return the on-disk enhancement cache, or None when caching is disabled or its directory is unwritable."""
+    global _disk_cache, _disk_cache_unavailable
+    if os.getenv("BRIA_CACHE", "1") == "0" or _disk_cache_unavailable:
+        return None
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None and not _disk_cache_unavailable:
+                directory = os.getenv(
+                    "BRIA_PROMPT_CACHE_DIR",
+                    os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "prompts")
+                )
+                try:
+                    _disk_cache = ResponseCache(directory, max_bytes=16 * 1024 * 1024, max_age=PROMPT_CACHE_TTL)
+                except OSError as e:
+                    _disk_cache_unavailable = True
+                    log_event(logger, logging.WARNING, "prompt_cache_unavailable",
+                              directory=directory, error=str(e))
+    return _disk_cache
+
+def _cached_enhancement(key: str) -> Optional[str]:
+    """Look an enhancement up in memory, then on disk (promoting disk hits)."""
+    enhanced = _memory_cache.get(key)
+    if enhanced is not None:
+        return enhanced
+
+    disk_cache = _get_disk_cache()
+    try:
+        result = disk_cache.get(key) if disk_cache is not None else None
+    except OSError:
+        # A broken cache is a miss: the prompt is enhanced again
+        result = None
+    if result and "prompt variations" in result:
+        _memory_cache.set(key, result["prompt variations"])
+        return result["prompt variations"]
+    return None
+
+def _store_enhancement(key: str, result: Dict[str, Any]) -> None:
+    """Cache a successful API response."""
+    if "prompt variations" not in result:
+        return
+    _memory_cache.set(key, result["prompt variations"])
+    disk_cache = _get_disk_cache()
+    if disk_cache is not None:
+        disk_cache.set(key, result)
 
 def enhance_prompt(
     api_key: str,
     prompt: str,
+    bypass_cache: bool = False,
     **kwargs
 ) -> str:
     """
     Enhance a prompt using Bria AI's prompt enhancement service.
-    
+
     Args:
         api_key: Bria AI API key
         prompt: Original prompt to enhance
+        bypass_cache: Always call the API instead of reusing a cached enhancement
         **kwargs: Additional parameters for the API
-    
+
     Returns:
         Enhanced prompt string
     """
-    url = "https://engine.prod.bria-api.com/v1/prompt_enhancer"
-    
-    headers = {
-        'api_token': api_key,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
+    path = "prompt_enhancer"
+
+    data = {
+        'prompt': prompt,
+        **kwargs
     }
-    
+
+    key = request_key(path, api_key, data)
+    if not bypass_cache:
+        enhanced = _cached_enhancement(key)
+        if enhanced is not None:
+            return enhanced
+
+    try:
+        result = get_client().post(path, api_key, data)
+        _store_enhancement(key, result)
+        return result.get("prompt variations", prompt)  # Return original prompt if enhancement fails
+    except Exception as e:
+        log_event(logger, logging.WARNING, "prompt_enhancement_failed", error=str(e))
+        return prompt  # Return original prompt on error
+
+async def aenhance_prompt(
+    api_key: str,
+    prompt: str,
+    bypass_cache: bool = False,
+    **kwargs
+) -> str:
+    """Async counterpart of enhance_prompt; accepts the same arguments."""
+    path = "prompt_enhancer"
+
     data = {
         'prompt': prompt,
         **kwargs
     }
-    
+
+    key = request_key(path, api_key, data)
+    if not bypass_cache:
+        enhanced = _cached_enhancement(key)
+        if enhanced is not None:
+            return enhanced
+
     try:
-        print(f"Making request to: {url}")
-        print(f"Headers: {headers}")
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response body: {response.text}")
-        
-        result = response.json()
+        result = await get_async_client().post(path, api_key, data)
+        _store_enhancement(key, result)
         return result.get("prompt variations", prompt)  # Return original prompt if enhancement fails
     except Exception as e:
-        print(f"Error enhancing prompt: {str(e)}")
-        return prompt  # Return original prompt on error 
\ No newline at end of file
+        log_event(logger, logging.WARNING, "prompt_enhancement_failed", error=str(e))
+        return prompt  # Return original prompt on error
+
+def enhance_prompts(
+    api_key: str,
+    prompts: List[str],
+    max_concurrency: int = 8,
+    **kwargs
+) -> List[str]:
+    """
+    Enhance a list of prompts concurrently.
+
+    Duplicate prompts are enhanced once. Prompts whose enhancement fails are
+    returned unchanged, so the result always lines up with `prompts`.
+
+    Args:
+        api_key: Bria AI API key
+        prompts: Prompts to enhance
+        max_concurrency: Maximum number of enhancement requests in flight
+        **kwargs: Additional parameters passed to enhance_prompt
+
+    Returns:
+        Enhanced prompts in the same order as `prompts`
+    """
+    unique = list(dict.fromkeys(prompts))
+    if not unique:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique)))) as pool:
+        # Run each call in a copy of the caller's context so it joins the caller's trace
+        contexts = [contextvars.copy_context() for _ in unique]
+        enhanced = dict(zip(unique, pool.map(
+            lambda ctx, p: ctx.run(enhance_prompt, api_key, p, **kwargs), contexts, unique)))
+    return [enhanced[p] for p in prompts]
+
+async def aenhance_prompts(
+    api_key: str,
+    prompts: List[str],
+    max_concurrency: int = 8,
+    **kwargs
+) -> List[str]:
+    """Async counterpart of enhance_prompts; accepts the same arguments."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def enhance_one(prompt: str) -> str:
+        async with semaphore:
+            return await aenhance_prompt(api_key, prompt, **kwargs)
+
+    unique = list(dict.fromkeys(prompts))
+    enhanced = dict(zip(unique, await asyncio.gather(*(enhance_one(p) for p in unique))))
+    return [enhanced[p] for p in prompts]
@@ -0,0 +1,99 @@
+from typing import Dict, Any, Optional
+import os
+import threading
+from .cache import SizedLRUCache
+from .metrics import RESULT_CACHE_LOOKUPS
+from .spool import ResultSpool, get_spool, fetch_result
+
+
+class ResultImageCache:
+    """
+    Process-wide cache of result image bytes keyed by URL.
+
+    Recently used images are kept in memory up to `max_bytes` and evicted
+    least recently used first; evicted images stay on disk in the result
+    spool, so a later lookup costs a file read rather than a download. The
+    cache is shared by every Streamlit session in the process, which is safe
+    because entries are immutable bytes keyed by URL.
+
+    Args:
+        max_bytes: Memory budget for cached image bytes
+        spool: Disk tier (default: get_spool())
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, spool: Optional[ResultSpool] = None):
+        self.max_bytes = max_bytes
+        self.spool = spool
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = SizedLRUCache(max_bytes)
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Return the image bytes for `url`, downloading them only if no tier has them.
+
+        Returns None if the result is not ready yet.
+        """
+        data = self._memory.get(url)
+        if data is not None:
+            RESULT_CACHE_LOOKUPS.inc(tier="memory")
+            return data
+
+        spool = self.spool or get_spool()
+        on_disk = spool.get(url) is not None
+        result = fetch_result(url, spool=spool)
+        if result is None:
+            return None
+        data = result.read()
+
+        with self._lock:
+            if on_disk:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+        RESULT_CACHE_LOOKUPS.inc(tier="disk" if on_disk else "network")
+        self._memory.set(url, data)
+        return data
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the disk tier is kept)."""
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory usage."""
+        memory = self._memory.stats()
+        with self._lock:
+            lookups = memory['hits'] + self.disk_hits + self.misses
+            return {
+                'memory_hits': memory['hits'],
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (memory['hits'] + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': memory['evictions'],
+                'entries': memory['entries'],
+                'bytes': memory['bytes']
+            }
+
+
+_result_cache: Optional[ResultImageCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultImageCache:
+    """
+    Return the process-wide ResultImageCache, creating it on first use.
+
+    The memory budget is read from BRIA_RESULT_CACHE_MB (default 64).
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultImageCache(
+                    max_bytes=int(float(os.getenv("BRIA_RESULT_CACHE_MB", "64")) * 1024 * 1024)
+                )
+    return _result_cache
+
+
+__all__ = ['ResultImageCache', 'get_result_cache']
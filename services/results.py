@@ -0,0 +1,39 @@
+from typing import Any, List, Optional
+
+
+def result_urls(response: Any) -> List[str]:
+    """
+    Return every result image URL found in an API response, in order.
+
+    Bria endpoints report results as `result_url`, `result_urls`, `urls` or a
+    `result` list whose items are either URL lists or dicts with `urls`.
+    """
+    if not isinstance(response, dict):
+        return []
+
+    if response.get("result_url"):
+        return [response["result_url"]]
+
+    for field in ("result_urls", "urls"):
+        if isinstance(response.get(field), list):
+            return [url for url in response[field] if isinstance(url, str)]
+
+    urls = []
+    if isinstance(response.get("result"), list):
+        for item in response["result"]:
+            if isinstance(item, dict) and "urls" in item:
+                urls.extend(item["urls"])
+            elif isinstance(item, list):
+                urls.extend(url for url in item if isinstance(url, str))
+            elif isinstance(item, str):
+                urls.append(item)
+    return urls
+
+
+def first_result_url(response: Any) -> Optional[str]:
+    """Return the first result image URL in an API response, or None."""
+    urls = result_urls(response)
+    return urls[0] if urls else None
+
+
+__all__ = ['result_urls', 'first_result_url']
@@ -0,0 +1,174 @@
+from typing import Dict, Optional, Tuple, Iterable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+# Statuses where the server did not process the request, safe to retry for any endpoint
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Statuses where the request may have been processed, only retried for idempotent endpoints
+SERVER_ERROR_STATUSES = frozenset({500, 502, 504})
+
+DEFAULT_TIMEOUTS = {
+    "text-to-image": (5.0, 120.0),
+    "product/lifestyle_shot": (5.0, 120.0),
+    "gen_fill": (5.0, 120.0),
+    "prompt_enhancer": (5.0, 30.0),
+}
+
+
+class RetryPolicy:
+    """
+    Decide whether and when a failed API call should be retried.
+
+    Generation endpoints are billed per call, so a request that may already
+    have been processed (read timeout, 5xx) is only retried when its endpoint
+    is listed as idempotent. Connection failures and throttling responses
+    (429/503) are always retried because the server never did the work.
+
+    Args:
+        max_attempts: Total number of attempts including the first one
+        backoff_base: Delay in seconds before the first retry
+        backoff_max: Upper bound for a single backoff delay
+        jitter: Fraction of the delay that is randomized (0-1)
+        timeouts: Mapping of endpoint path prefix to (connect, read) timeouts
+        default_timeout: (connect, read) timeout for endpoints not in `timeouts`
+        idempotent_paths: Endpoint path prefixes that are safe to repeat
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        jitter: float = 0.5,
+        timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        default_timeout: Tuple[float, float] = (5.0, 60.0),
+        idempotent_paths: Iterable[str] = ("prompt_enhancer",)
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = max(0.0, min(jitter, 1.0))
+        self.timeouts = dict(DEFAULT_TIMEOUTS if timeouts is None else timeouts)
+        self.default_timeout = default_timeout
+        self.idempotent_paths = tuple(idempotent_paths)
+
+    def timeout_for(self, path: str) -> Tuple[float, float]:
+        """Return the (connect, read) timeout for an endpoint path."""
+        path = path.lstrip("/")
+        for prefix, timeout in self.timeouts.items():
+            if path.startswith(prefix):
+                return timeout
+        return self.default_timeout
+
+    def is_idempotent(self, path: str) -> bool:
+        """Return True if repeating a request to this endpoint is harmless."""
+        return path.lstrip("/").startswith(self.idempotent_paths)
+
+    def should_retry_status(self, path: str, status: int, attempt: int) -> bool:
+        """Return True if a response with this status should be retried."""
+        if attempt >= self.max_attempts:
+            return False
+        if status in THROTTLE_STATUSES:
+            return True
+        return status in SERVER_ERROR_STATUSES and self.is_idempotent(path)
+
+    def should_retry_error(self, path: str, request_sent: bool, attempt: int) -> bool:
+        """
+        Return True if a transport error should be retried.
+
+        Args:
+            path: Endpoint path
+            request_sent: False if the failure happened before the request
+                reached the server (connect error/timeout)
+            attempt: Number of attempts made so far
+        """
+        if attempt >= self.max_attempts:
+            return False
+        return not request_sent or self.is_idempotent(path)
+
+    def backoff(self, attempt: int) -> float:
+        """Return the exponential backoff delay with jitter after `attempt` attempts."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the outbound request rate.
+
+    The bucket only computes how long a caller has to wait, so the same
+    instance serves both blocking and asyncio callers. A server rate-limit
+    signal pauses the whole bucket until the advertised reset time.
+
+    Args:
+        rate: Tokens added per second (0 disables limiting)
+        capacity: Maximum burst size
+    """
+
+    def __init__(self, rate: float = 0.0, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate <= 0:
+                return wait
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    Return the server-requested delay in seconds from rate-limit headers.
+
+    Understands `Retry-After` (seconds or HTTP date) and falls back to
+    `X-RateLimit-Reset` when `X-RateLimit-Remaining` is exhausted.
+    """
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    if headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(headers.get("X-RateLimit-Reset", "")))
+        except ValueError:
+            pass
+
+    return None
+
+
+__all__ = ['RetryPolicy', 'TokenBucket', 'parse_retry_after']
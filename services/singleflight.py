@@ -0,0 +1,96 @@
+from typing import Dict, Any, Callable, Awaitable, Optional
+import asyncio
+import copy
+import hashlib
+import threading
+from .payload import canonical_json
+
+
+def request_key(path: str, api_key: str, data: Dict[str, Any]) -> str:
+    """
+    Return a canonical hash identifying an API request.
+
+    The payload is serialized with sorted keys so logically identical requests
+    hash the same regardless of argument order; image fields contribute their
+    content hash rather than their base64 text. The API key is part of the
+    hash so results are never shared between accounts.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(path.lstrip("/").encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(hashlib.sha256((api_key or "").encode("utf-8")).digest())
+    hasher.update(canonical_json(data))
+    return hasher.hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls from different threads into one.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and receive a copy of the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run `fn` once per in-flight `key` and return its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent identical coroutine calls on one event loop into one.
+
+    The shared request runs as its own task, so cancelling any single caller
+    does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, "asyncio.Task"] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `fn` once per in-flight `key` and return its result."""
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+
+__all__ = ['SingleFlight', 'AsyncSingleFlight', 'request_key']
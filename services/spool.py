@@ -0,0 +1,254 @@
+from typing import Optional
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import requests
+from .client import get_client
+from .log import get_logger, log_event
+from .metrics import REQUEST_LATENCY, REQUEST_ERRORS, DOWNLOAD_BYTES
+from .tracing import span
+
+logger = get_logger("spool")
+
+DEFAULT_SPOOL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "studio", "results")
+
+# Statuses a result URL returns while the async job is still rendering
+NOT_READY_STATUSES = {403, 404}
+
+CHUNK_SIZE = 256 * 1024
+
+
+class SpooledResult:
+    """
+    A result image downloaded to a spool file.
+
+    Args:
+        url: Result URL the file was fetched from
+        path: Local file holding the image bytes
+        size: File size in bytes
+        elapsed: Seconds spent fetching it (0 when served from the spool)
+        resumed: Number of times the transfer was resumed after a failure
+    """
+
+    __slots__ = ('url', 'path', 'size', 'elapsed', 'resumed')
+
+    def __init__(self, url: str, path: str, size: int, elapsed: float = 0.0, resumed: int = 0):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.elapsed = elapsed
+        self.resumed = resumed
+
+    def read(self) -> bytes:
+        """Return the image bytes."""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def __repr__(self) -> str:
+        return f"<SpooledResult {self.size} bytes {self.path}>"
+
+
+class ResultSpool:
+    """
+    Directory of downloaded result images keyed by URL hash.
+
+    Complete files are named by the SHA-256 of their URL; transfers in
+    progress use a `.part` file so an interrupted download can be resumed.
+    The least recently used files are removed once the spool grows past
+    `max_bytes`. If `directory` cannot be created, a temporary directory is
+    used instead, so downloads still work but do not survive a restart.
+
+    Args:
+        directory: Directory holding the spool files
+        max_bytes: Size budget for complete files
+    """
+
+    def __init__(self, directory: str = DEFAULT_SPOOL_DIR, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest access first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Striped locks so only one thread downloads a given URL at a time
+        self._url_locks = [threading.Lock() for _ in range(64)]
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            # Results must land in a file, so use a private temp directory for this process instead
+            self.directory = tempfile.mkdtemp(prefix="studio-results-")
+            log_event(logger, logging.WARNING, "spool_dir_unavailable", directory=directory,
+                      fallback=self.directory, error=str(e))
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url))
+
+    def part_path(self, url: str) -> str:
+        return self.path(url) + ".part"
+
+    def url_lock(self, url: str) -> threading.Lock:
+        """Return the lock serializing downloads of `url`."""
+        return self._url_locks[int(self.key(url)[:8], 16) % len(self._url_locks)]
+
+    def get(self, url: str) -> Optional[SpooledResult]:
+        """Return the spooled result for `url`, or None if it was not fetched yet."""
+        key = self.key(url)
+        with self._lock:
+            size = self._index.get(key)
+            if size is None:
+                return None
+            self._index.move_to_end(key)
+        return SpooledResult(url, self.path(url), size)
+
+    def commit(self, url: str) -> int:
+        """Promote the finished `.part` file of `url` to a complete entry and return its size."""
+        key = self.key(url)
+        path = self.path(url)
+        os.replace(self.part_path(url), path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                evicted, evicted_size = self._index.popitem(last=False)
+                self._bytes -= evicted_size
+                try:
+                    os.remove(os.path.join(self.directory, evicted))
+                except OSError:
+                    pass
+        return size
+
+
+_spool: Optional[ResultSpool] = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> ResultSpool:
+    """
+    Return the process-wide ResultSpool, creating it on first use.
+
+    Configured from BRIA_SPOOL_DIR and BRIA_SPOOL_MAX_MB (default 512).
+    """
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = ResultSpool(
+                    directory=os.getenv("BRIA_SPOOL_DIR", DEFAULT_SPOOL_DIR),
+                    max_bytes=int(float(os.getenv("BRIA_SPOOL_MAX_MB", "512")) * 1024 * 1024)
+                )
+    return _spool
+
+
+def fetch_result(
+    url: str,
+    timeout: float = 30,
+    max_resumes: int = 3,
+    spool: Optional[ResultSpool] = None
+) -> Optional[SpooledResult]:
+    """
+    Check whether an async result is ready and download it in the same request.
+
+    A single streamed GET replaces the HEAD-then-GET pair: a not-ready status
+    returns None, otherwise the body is written to the spool in chunks. If the
+    connection drops mid-transfer the download resumes from the bytes already
+    on disk with a Range request (or restarts if the server ignores it).
+    Results already in the spool are returned without any request.
+
+    Args:
+        url: Result URL
+        timeout: Connect/read timeout in seconds
+        max_resumes: How many interrupted transfers to resume before giving up
+        spool: Spool to write to (default: get_spool())
+
+    Returns:
+        The spooled result, or None if the result is not ready yet
+    """
+    spool = spool or get_spool()
+    cached = spool.get(url)
+    if cached is not None:
+        return cached
+
+    with spool.url_lock(url):
+        # Another thread may have finished the download while we waited
+        cached = spool.get(url)
+        if cached is not None:
+            return cached
+        return _download(url, spool, timeout, max_resumes)
+
+
+def _download(url: str, spool: ResultSpool, timeout: float, max_resumes: int) -> Optional[SpooledResult]:
+    part = spool.part_path(url)
+    session = get_client().session
+    started = time.monotonic()
+    resumed = 0
+
+    with span("download.result", url=url) as fetch_span:
+        while True:
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {'Range': f"bytes={offset}-"} if offset else {}
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                    if response.status_code in NOT_READY_STATUSES:
+                        return None
+                    if response.status_code == 416 and offset:
+                        # Everything was already received before the failure
+                        break
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0
+                    expected = response.headers.get("Content-Length")
+                    received = 0
+                    with open(part, "ab" if offset else "wb") as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            received += len(chunk)
+                    if expected is not None and received < int(expected):
+                        raise requests.exceptions.ChunkedEncodingError(
+                            f"Received {received} of {expected} bytes")
+                break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                if resumed >= max_resumes:
+                    REQUEST_ERRORS.inc(endpoint="result", error=type(e).__name__)
+                    raise
+                resumed += 1
+                log_event(logger, logging.WARNING, "result_fetch_resume", url=url,
+                          offset=os.path.getsize(part) if os.path.exists(part) else 0,
+                          error=type(e).__name__)
+
+        size = spool.commit(url)
+        elapsed = time.monotonic() - started
+        fetch_span.set(bytes=size, resumed=resumed)
+
+    REQUEST_LATENCY.observe(elapsed, endpoint="result")
+    DOWNLOAD_BYTES.inc(size, endpoint="result")
+    log_event(logger, logging.INFO, "result_fetched", url=url, bytes=size,
+              latency_ms=round(elapsed * 1000, 1), resumed=resumed)
+    return SpooledResult(url, spool.path(url), size, elapsed, resumed)
+
+
+__all__ = [
+    'SpooledResult',
+    'ResultSpool',
+    'get_spool',
+    'fetch_result',
+    'DEFAULT_SPOOL_DIR'
+]
@@ -0,0 +1,184 @@
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from PIL import Image, ImageOps
+from .cache import SizedLRUCache
+from .log import get_logger, log_event
+from .tracing import traced
+
+logger = get_logger("thumbnails")
+
+# Longest side of on-screen previews; about 2x a typical column for sharp HiDPI display
+THUMBNAIL_SIZE = 768
+
+DEFAULT_THUMBNAIL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "studio", "thumbnails")
+
+
+def image_file_type(image_bytes: bytes) -> Tuple[str, str]:
+    """Return (extension, mime type) for image bytes from their signature."""
+    if image_bytes.startswith(b"\x89PNG"):
+        return "png", "image/png"
+    if image_bytes.startswith(b"\xff\xd8"):
+        return "jpg", "image/jpeg"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return "png", "image/png"
+
+
+@traced("transform.thumbnail")
+def make_thumbnail(image_bytes: bytes, max_side: int = THUMBNAIL_SIZE, quality: int = 80) -> bytes:
+    """
+    Encode a compact WebP preview of an image.
+
+    The image is shrunk so its longest side is at most `max_side` (never
+    upscaled), rotated upright according to its EXIF orientation, and
+    transparency is kept. The original bytes are returned if
+    the preview would not be smaller.
+
+    Args:
+        image_bytes: Full-resolution image bytes
+        max_side: Maximum preview width/height in pixels
+        quality: WebP quality
+
+    Returns:
+        Preview image bytes
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("RGB", (max_side, max_side))
+    # WebP previews carry no EXIF, so rotate phone photos upright like the full image shows
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    thumbnail = buffer.getvalue()
+    return thumbnail if len(thumbnail) < len(image_bytes) else image_bytes
+
+
+class ThumbnailCache:
+    """
+    Preview images keyed by the content hash of the full image and preview size.
+
+    Thumbnails are made once: recent ones are kept in memory (LRU, bounded by
+    `max_bytes`) and every one is also written to `directory`, so reruns,
+    other sessions and restarts reuse them.
+
+    Args:
+        directory: Directory holding thumbnail files (None keeps them in memory only)
+        max_bytes: Memory budget for cached thumbnails
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_THUMBNAIL_DIR, max_bytes: int = 32 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = SizedLRUCache(max_bytes)
+        self._lock = threading.Lock()
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                log_event(logger, logging.WARNING, "thumbnail_dir_unavailable", directory=directory, error=str(e))
+                self.directory = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.webp")
+
+    def _store(self, key: str, thumbnail: bytes) -> None:
+        """Write a thumbnail file; on failure (read-only or full disk) it is only kept in memory."""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            log_event(logger, logging.DEBUG, "thumbnail_store_failed", error=str(e))
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def get(self, image_bytes: bytes, max_side: int = THUMBNAIL_SIZE) -> bytes:
+        """Return the preview of `image_bytes`, making it on first use."""
+        key = f"{hashlib.sha256(image_bytes).hexdigest()}_{max_side}"
+        thumbnail = self._memory.get(key)
+        if thumbnail is not None:
+            with self._lock:
+                self.hits += 1
+            return thumbnail
+
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    thumbnail = f.read()
+            except OSError:
+                thumbnail = None
+
+        if thumbnail is None:
+            try:
+                thumbnail = make_thumbnail(image_bytes, max_side)
+            except Exception as e:
+                log_event(logger, logging.WARNING, "thumbnail_failed", error=str(e))
+                return image_bytes
+            if self.directory:
+                self._store(key, thumbnail)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        self._memory.set(key, thumbnail)
+        return thumbnail
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory usage."""
+        memory = self._memory.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': memory['entries'],
+                'bytes': memory['bytes']
+            }
+
+
+_thumbnails: Optional[ThumbnailCache] = None
+_thumbnails_lock = threading.Lock()
+
+
+def get_thumbnail(image_bytes: bytes, max_side: int = THUMBNAIL_SIZE) -> bytes:
+    """
+    Return a cached preview of `image_bytes` from the process-wide ThumbnailCache.
+
+    Configured from BRIA_THUMBNAIL_DIR and BRIA_THUMBNAIL_CACHE_MB (default 32).
+    """
+    global _thumbnails
+    if _thumbnails is None:
+        with _thumbnails_lock:
+            if _thumbnails is None:
+                _thumbnails = ThumbnailCache(
+                    directory=os.getenv("BRIA_THUMBNAIL_DIR", DEFAULT_THUMBNAIL_DIR),
+                    max_bytes=int(float(os.getenv("BRIA_THUMBNAIL_CACHE_MB", "32")) * 1024 * 1024)
+                )
+    return _thumbnails.get(image_bytes, max_side)
+
+
+__all__ = [
+    'ThumbnailCache',
+    'make_thumbnail',
+    'get_thumbnail',
+    'image_file_type',
+    'THUMBNAIL_SIZE'
+]
@@ -0,0 +1,213 @@
+from typing import Dict, Any, Optional, List, Iterator
+from collections import deque
+from contextlib import contextmanager
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+
+
+class Span:
+    """
+    One timed operation within a trace.
+
+    Args:
+        name: Operation name, e.g. "api.product/packshot" or "stage.packshot"
+        trace_id: ID shared by every span of one end-to-end operation
+        parent_id: span_id of the enclosing span, if any
+        attributes: Extra key/value details recorded with the span
+    """
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'start', 'duration', 'thread_id', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'thread_id': self.thread_id,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is disabled."""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("studio_span", default=None)
+
+
+class Tracer:
+    """
+    Collects finished spans in memory and exports them.
+
+    Only the most recent `max_spans` spans are kept, so a long-running
+    process does not grow without bound.
+
+    Args:
+        max_spans: Maximum number of finished spans retained
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self.enabled = False
+        self._spans: "deque[Span]" = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span (or a new trace)."""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+        token = _current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current.reset(token)
+            with self._lock:
+                self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """Return finished spans, optionally only those of one trace."""
+        with self._lock:
+            spans = list(self._spans)
+        return [s for s in spans if trace_id is None or s.trace_id == trace_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def export_json(self, path: str, trace_id: Optional[str] = None) -> None:
+        """Write finished spans to `path` as a JSON list."""
+        with open(path, "w") as f:
+            json.dump([s.to_dict() for s in self.spans(trace_id)], f, default=str)
+
+    def export_chrome_trace(self, path: str, trace_id: Optional[str] = None) -> None:
+        """
+        Write finished spans to `path` in the Chrome trace event format.
+
+        Open the file in chrome://tracing or https://ui.perfetto.dev; each
+        thread is a row and nested spans stack under their parents.
+        """
+        pid = os.getpid()
+        events = [{
+            'name': s.name,
+            'cat': s.name.split(".", 1)[0],
+            'ph': 'X',
+            'ts': s.start * 1e6,
+            'dur': (s.duration or 0.0) * 1e6,
+            'pid': pid,
+            'tid': s.thread_id,
+            'args': {**s.attributes, 'trace_id': s.trace_id, 'span_id': s.span_id,
+                     'parent_id': s.parent_id, **({'error': s.error} if s.error else {})}
+        } for s in self.spans(trace_id)]
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attributes: Any):
+    """Context manager timing a block on the process-wide tracer."""
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str):
+    """Decorator wrapping each call of a sync or async function in a span."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the trace ID of the active span, if any."""
+    current = _current.get()
+    return current.trace_id if current else None
+
+
+def enable_tracing(path: Optional[str] = None) -> None:
+    """
+    Start recording spans.
+
+    Args:
+        path: If given, the spans are written there as a Chrome trace when
+            the process exits
+    """
+    tracer.enabled = True
+    if path:
+        atexit.register(tracer.export_chrome_trace, path)
+
+
+if os.getenv("BRIA_TRACE_FILE"):
+    enable_tracing(os.getenv("BRIA_TRACE_FILE"))
+elif os.getenv("BRIA_TRACE", "0") != "0":
+    enable_tracing()
+
+
+__all__ = [
+    'Span',
+    'Tracer',
+    'tracer',
+    'span',
+    'traced',
+    'current_trace_id',
+    'enable_tracing'
+]
@@ -0,0 +1,105 @@
+from typing import Dict, Any, Optional
+import io
+import logging
+import threading
+from PIL import Image, ImageOps
+from .log import get_logger, log_event
+from .tracing import traced
+
+logger = get_logger("upload_optimizer")
+
+# Largest output side the product endpoints produce; larger uploads are wasted bytes
+DEFAULT_MAX_SIDE = 2000
+
+_stats = {'images': 0, 'optimized': 0, 'original_bytes': 0, 'sent_bytes': 0}
+_stats_lock = threading.Lock()
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+@traced("transform.optimize_upload")
+def optimize_image(
+    image_data: bytes,
+    max_side: int = DEFAULT_MAX_SIDE,
+    preserve_alpha: bool = True,
+    quality: int = 90,
+    min_quality: int = 70,
+    target_bytes: Optional[int] = None
+) -> bytes:
+    """
+    Downscale and re-encode an image before upload.
+
+    The image is shrunk so its longest side is at most `max_side` (never
+    upscaled). Images with transparency are kept as PNG when `preserve_alpha`
+    is set, since the product endpoints use the alpha channel as the cutout;
+    everything else is re-encoded as JPEG, lowering quality down to
+    `min_quality` until it fits `target_bytes`. Re-encoded images are
+    rotated upright according to their EXIF orientation. The original bytes
+    are returned whenever re-encoding would not make the upload smaller.
+
+    Args:
+        image_data: Original image bytes
+        max_side: Maximum width/height in pixels the endpoint needs
+        preserve_alpha: Keep the alpha channel if the image has one
+        quality: Starting JPEG quality
+        min_quality: Lowest JPEG quality tried when aiming for `target_bytes`
+        target_bytes: Optional size goal for the encoded image
+
+    Returns:
+        Image bytes to upload
+    """
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        needs_resize = max(image.size) > max_side
+        if not needs_resize and (target_bytes is None or len(image_data) <= target_bytes):
+            result = image_data
+        else:
+            keep_alpha = preserve_alpha and _has_alpha(image)
+            if not keep_alpha:
+                # Let JPEG decode at reduced scale straight away
+                image.draft("RGB", (max_side, max_side))
+            # Re-encoding drops the EXIF Orientation tag, so bake the rotation into the pixels
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if keep_alpha else "RGB")
+            if needs_resize:
+                image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if keep_alpha:
+                image.save(buffer, format="PNG", optimize=True)
+            else:
+                image.save(buffer, format="JPEG", quality=quality, optimize=True)
+                while target_bytes and buffer.tell() > target_bytes and quality > min_quality:
+                    quality = max(min_quality, quality - 5)
+                    buffer = io.BytesIO()
+                    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+
+            encoded = buffer.getvalue()
+            result = encoded if len(encoded) < len(image_data) else image_data
+    except Exception as e:
+        log_event(logger, logging.WARNING, "upload_optimization_skipped", error=str(e))
+        result = image_data
+
+    with _stats_lock:
+        _stats['images'] += 1
+        _stats['optimized'] += result is not image_data
+        _stats['original_bytes'] += len(image_data)
+        _stats['sent_bytes'] += len(result)
+
+    if result is not image_data:
+        log_event(logger, logging.INFO, "upload_optimized", original_bytes=len(image_data),
+                  sent_bytes=len(result), saved_bytes=len(image_data) - len(result))
+    return result
+
+
+def upload_stats() -> Dict[str, Any]:
+    """Return totals of images seen and bytes saved by optimize_image."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['saved_bytes'] = stats['original_bytes'] - stats['sent_bytes']
+    return stats
+
+
+__all__ = ['optimize_image', 'upload_stats', 'DEFAULT_MAX_SIDE']
@@ -0,0 +1,27 @@
+import io
+from PIL import Image
+from services.upload_optimizer import optimize_image
+
+
+def _jpeg(size, orientation=None):
+    image = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def test_rotated_photo_is_uploaded_upright():
+    # Orientation 6: stored landscape, displayed rotated 90 degrees clockwise
+    data = _jpeg((4000, 3000), orientation=6)
+    result = Image.open(io.BytesIO(optimize_image(data, max_side=2000)))
+    assert result.size == (1500, 2000)
+    assert result.getexif().get(0x0112) in (None, 1)
+
+
+def test_unrotated_photo_keeps_its_shape():
+    data = _jpeg((4000, 3000))
+    result = Image.open(io.BytesIO(optimize_image(data, max_side=2000)))
+    assert result.size == (2000, 1500)
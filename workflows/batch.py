@@ -0,0 +1,426 @@
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from contextlib import closing
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+from dotenv import load_dotenv # type: ignore
+from services.init import get_poller, fetch_result
+from services.log import get_logger, log_event
+from services.poller import PENDING
+from services.thumbnails import image_file_type
+from services.tracing import span
+from workflows.dag import SUCCEEDED
+from workflows.generate_ad_set import DEFAULT_CONFIG, iter_ad_set, stage_fingerprints
+from workflows.journal import RunJournal
+
+logger = get_logger("batch")
+
+# Manifest columns that describe the row rather than override the config
+ROW_FIELDS = ("sku", "image", "prompt")
+
+# Config keys a manifest row may set besides the sidebar settings
+EXTRA_CONFIG_KEYS = ("stage_timeout", "stage_timeouts", "required_stages")
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+
+
+def _coerce(key: str, value: Any) -> Any:
+    """Convert a CSV cell to the type of the config key's default."""
+    if not isinstance(value, str):
+        return value
+    default = DEFAULT_CONFIG.get(key)
+    if isinstance(default, bool):
+        return value.strip().lower() in TRUE_VALUES
+    if isinstance(default, int):
+        return int(value)
+    if key == "stage_timeout":
+        return float(value)
+    if key in ("stage_timeouts", "required_stages"):
+        return json.loads(value)
+    return value
+
+
+def _parse_row(raw: Dict[str, Any], base_dir: str, line: int, ignored: set) -> Dict[str, Any]:
+    config = dict(raw.get("config") or {})
+    for key, value in raw.items():
+        if key in ROW_FIELDS or key == "config" or value in (None, ""):
+            continue
+        if key in DEFAULT_CONFIG or key in EXTRA_CONFIG_KEYS:
+            try:
+                config[key] = _coerce(key, value)
+            except ValueError:
+                raise ValueError(f"Manifest line {line}: invalid {key} value {value!r}")
+        elif key not in ignored:
+            ignored.add(key)
+            log_event(logger, logging.WARNING, "manifest_unknown_column", line=line, column=key)
+
+    sku = str(raw.get("sku") or "").strip()
+    if not sku:
+        raise ValueError(f"Manifest line {line}: missing sku")
+    image = (raw.get("image") or "").strip() or None
+    if image and not image.startswith(("http://", "https://")):
+        image = os.path.join(base_dir, image)
+    prompt = (raw.get("prompt") or "").strip() or None
+    if not image and not prompt:
+        raise ValueError(f"Manifest line {line}: sku {sku} needs an image or a prompt")
+    return {'line': line, 'sku': sku, 'image': image, 'prompt': prompt, 'config': config}
+
+
+def read_manifest(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of a CSV or JSONL manifest one at a time.
+
+    Each row has a `sku`, an `image` (file path relative to the manifest, or
+    URL) and/or a `prompt`. Any other column named like a sidebar setting
+    (e.g. `create_packshot`, `shadow_type`, `num_results`) overrides the
+    config for that row; JSONL rows may also carry a nested `config` object.
+
+    A row that cannot be parsed is yielded as {'line', 'sku', 'error'} so
+    the caller can report it and carry on with the next one.
+
+    Args:
+        path: Manifest file; `.jsonl` / `.ndjson` files are read as JSON lines,
+            anything else as CSV with a header row
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    ignored = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = ((line, text) for line, text in enumerate(f, start=1) if text.strip())
+        else:
+            rows = enumerate(csv.DictReader(f), start=2)
+        for line, raw in rows:
+            try:
+                if isinstance(raw, str):
+                    raw = json.loads(raw)
+                    if not isinstance(raw, dict):
+                        raise ValueError(f"Manifest line {line}: expected a JSON object")
+                yield _parse_row(raw, base_dir, line, ignored)
+            except (ValueError, TypeError, AttributeError) as e:
+                sku = raw.get("sku") if isinstance(raw, dict) else None
+                yield {'line': line, 'sku': str(sku).strip() if sku else None, 'error': str(e)}
+
+
+def _safe_name(sku: str) -> str:
+    return re.sub(r"[^\w.-]", "_", sku)
+
+
+def _source_identity(image: Optional[str]) -> Optional[str]:
+    """Identify a row's source image cheaply: a URL as is, a local file by path, size and mtime."""
+    if not image:
+        return None
+    if image.startswith(("http://", "https://")):
+        return f"url:{image}"
+    stat = os.stat(image)
+    return f"file:{os.path.abspath(image)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def row_fingerprints(row: Dict[str, Any], base_config: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, str], str]:
+    """
+    Return the stage fingerprints of a manifest row and the fingerprint of the whole row.
+
+    The row fingerprint also covers which stages are enabled, so a finished
+    SKU runs again when a stage is switched on.
+    """
+    config = {**DEFAULT_CONFIG, **(base_config or {}), **row['config']}
+    fingerprints = stage_fingerprints(_source_identity(row['image']), row['prompt'], config)
+    enabled = {key: config.get(key) for key in ("create_packshot", "add_shadow", "lifestyle_shot")}
+    digest = hashlib.sha256(json.dumps([fingerprints, enabled], sort_keys=True).encode("utf-8")).hexdigest()
+    return fingerprints, digest
+
+
+def _wait_for_files(urls: List[str], timeout: float) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Download the results at `urls`, polling the ones still rendering for up to `timeout` seconds.
+
+    Returns:
+        ({url: spooled file}, {url: error}) for the URLs that were fetched or failed
+    """
+    files, errors, pending = {}, {}, []
+    for url in urls:
+        try:
+            spooled = fetch_result(url)
+        except Exception as e:
+            errors[url] = f"Download failed: {e}"
+            continue
+        if spooled is not None:
+            files[url] = spooled.path
+        else:
+            pending.append(url)
+    if not pending:
+        return files, errors
+
+    poller = get_poller()
+    job_id = poller.submit(pending, deadline=timeout)
+    while True:
+        status = poller.status(job_id)
+        if status is None or status['state'] != PENDING:
+            break
+        time.sleep(min(status['next_check_in'] or 0.5, 1.0))
+    if status:
+        files.update(status['files'])
+    return files, errors
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_row(
+    api_key: str,
+    row: Dict[str, Any],
+    out_dir: str,
+    base_config: Optional[Dict[str, Any]] = None,
+    result_timeout: float = 300,
+    journal: Optional[RunJournal] = None,
+    fingerprints: Optional[Tuple[Dict[str, str], str]] = None
+) -> Dict[str, Any]:
+    """
+    Generate the ad set of one manifest row and write its results to `out_dir/<sku>/`.
+
+    Result images are saved as `<stage>_<n>.<ext>` as soon as their stage
+    completes, together with a `result.json` of the API responses. With a
+    journal, stages that succeeded in an earlier run with the same
+    fingerprint (see row_fingerprints) are replayed from it and their result
+    images already saved with the recorded size are kept.
+
+    Returns:
+        The row's status record
+    """
+    sku = row['sku']
+    sku_dir = os.path.join(out_dir, _safe_name(sku))
+    os.makedirs(sku_dir, exist_ok=True)
+    config = {**DEFAULT_CONFIG, **(base_config or {}), **row['config']}
+    started = time.monotonic()
+    record = {'sku': sku, 'stages': {}, 'errors': {}, 'files': []}
+    responses = {}
+    stage_fps, row_fp = fingerprints or row_fingerprints(row, base_config)
+    completed = journal.completed_stages(sku, stage_fps) if journal else {}
+    saved = journal.blobs(sku) if journal else {}
+
+    with span("batch.row", sku=sku):
+        image = row['image']
+        if image and not image.startswith(("http://", "https://")):
+            with open(image, "rb") as f:
+                image = f.read()
+
+        for event in iter_ad_set(api_key, image=image, prompt=row['prompt'], config=config,
+                                 completed=completed):
+            stage = event['stage']
+            record['stages'][stage] = event['status']
+            if journal and not event['replayed']:
+                journal.record_stage(sku, stage, event['status'], fingerprint=stage_fps.get(stage),
+                                     response=event['result'], urls=event['urls'], error=event['error'])
+            if event['status'] != SUCCEEDED:
+                record['errors'][stage] = event['error']
+                continue
+            responses[stage] = event['result']
+
+            # Keep result images saved by an earlier run; fetch only the missing ones
+            urls, kept = [], {}
+            for url in event['urls']:
+                blob = saved.get((stage, url)) if event['replayed'] else None
+                if blob and os.path.exists(blob['path']) and os.path.getsize(blob['path']) == blob['size']:
+                    kept[url] = blob['path']
+                else:
+                    urls.append(url)
+            # Download errors are recorded per image so the remaining stages are still collected
+            files, failures = _wait_for_files(urls, result_timeout) if urls else ({}, {})
+
+            for idx, url in enumerate(event['urls'], start=1):
+                if url in kept:
+                    record['files'].append(os.path.relpath(kept[url], out_dir))
+                    continue
+                if url in failures:
+                    record['errors'][f"{stage}_{idx}"] = failures[url]
+                    continue
+                if url not in files:
+                    record['errors'][f"{stage}_{idx}"] = "Result not ready before the timeout"
+                    continue
+                try:
+                    with open(files[url], "rb") as f:
+                        extension, _ = image_file_type(f.read(16))
+                    name = f"{stage}_{idx}.{extension}"
+                    path = os.path.join(sku_dir, name)
+                    shutil.copyfile(files[url], path)
+                except OSError as e:
+                    record['errors'][f"{stage}_{idx}"] = f"Saving failed: {e}"
+                    continue
+                record['files'].append(os.path.join(_safe_name(sku), name))
+                if journal:
+                    journal.record_blob(sku, stage, url, path, _sha256_file(path), os.path.getsize(path))
+
+    with open(os.path.join(sku_dir, "result.json"), "w", encoding="utf-8") as f:
+        json.dump({'sku': sku, 'responses': responses, 'errors': record['errors']}, f, indent=2, default=str)
+
+    succeeded = [stage for stage, status in record['stages'].items() if status == SUCCEEDED]
+    if not record['errors'] and succeeded:
+        record['status'] = "succeeded"
+    else:
+        record['status'] = "partial" if succeeded else "failed"
+    record['elapsed'] = round(time.monotonic() - started, 2)
+    if journal:
+        journal.record_row(sku, record['status'], fingerprint=row_fp)
+    return record
+
+
+def run_batch(
+    manifest: str,
+    out_dir: str,
+    api_key: str,
+    workers: int = 4,
+    max_pending: Optional[int] = None,
+    base_config: Optional[Dict[str, Any]] = None,
+    result_timeout: float = 300,
+    journal_path: Optional[str] = None,
+    fresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Generate ad sets for every row of a manifest.
+
+    Rows are read lazily and handed to a pool of `workers` threads; at most
+    `max_pending` rows are queued or running at once, so memory stays flat
+    for any manifest size. One JSON line per finished row is appended to
+    `out_dir/status.jsonl`.
+
+    Progress is recorded in a RunJournal, so running the same manifest
+    again resumes it: SKUs that finished with the same inputs and config
+    are skipped and, for the others, only stages that failed, never ran or
+    whose inputs changed call the API.
+
+    Args:
+        manifest: CSV or JSONL manifest (see read_manifest)
+        out_dir: Output directory
+        api_key: Bria AI API key
+        workers: Rows processed concurrently
+        max_pending: Rows submitted but not finished (default: 2 * workers)
+        base_config: Config applied to every row before its own overrides
+        result_timeout: Seconds to wait for async results of one stage
+        journal_path: SQLite run journal (default: out_dir/journal.sqlite)
+        fresh: Forget the journal and process every row again
+
+    Returns:
+        Summary with row counts, elapsed seconds and SKUs per minute
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    max_pending = max_pending or 2 * workers
+    counts = {'succeeded': 0, 'partial': 0, 'failed': 0, 'skipped': 0}
+    started = time.monotonic()
+    running: Dict[Future, Dict[str, Any]] = {}
+
+    journal = RunJournal(journal_path or os.path.join(out_dir, "journal.sqlite"))
+    if fresh:
+        journal.clear()
+    finished = journal.finished_skus()
+    if finished:
+        log_event(logger, logging.INFO, "batch_resumed", finished=len(finished))
+
+    with closing(journal), \
+            open(os.path.join(out_dir, "status.jsonl"), "a", encoding="utf-8") as status_log, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+
+        def finish(record: Dict[str, Any]) -> None:
+            counts[record['status']] += 1
+            status_log.write(json.dumps(record, default=str) + "\n")
+            status_log.flush()
+            log_event(logger, logging.INFO, "batch_row_finished", sku=record['sku'],
+                      status=record['status'], elapsed_s=record.get('elapsed'))
+
+        def drain() -> None:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                row = running.pop(future)
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    finish({'sku': row['sku'], 'line': row['line'], 'status': "failed", 'errors': {'row': str(e)}})
+
+        for row in read_manifest(manifest):
+            if 'error' in row:
+                finish({'sku': row['sku'], 'line': row['line'], 'status': "failed",
+                        'errors': {'manifest': row['error']}})
+                continue
+            try:
+                fingerprints = row_fingerprints(row, base_config)
+            except OSError as e:
+                finish({'sku': row['sku'], 'line': row['line'], 'status': "failed", 'errors': {'image': str(e)}})
+                continue
+            if row['sku'] in finished and finished[row['sku']] == fingerprints[1]:
+                counts['skipped'] += 1
+                continue
+            # Backpressure: do not read further rows until a slot frees up
+            while len(running) >= max_pending:
+                drain()
+            future = pool.submit(process_row, api_key, row, out_dir, base_config, result_timeout,
+                                 journal, fingerprints)
+            running[future] = row
+        while running:
+            drain()
+
+    elapsed = time.monotonic() - started
+    rows = sum(counts.values()) - counts['skipped']
+    summary = {
+        'rows': rows,
+        **counts,
+        'elapsed_s': round(elapsed, 1),
+        'skus_per_minute': round(rows / elapsed * 60, 2) if elapsed > 0 else 0.0
+    }
+    log_event(logger, logging.INFO, "batch_finished", **summary)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m workflows.batch MANIFEST [options]."""
+    parser = argparse.ArgumentParser(
+        prog="python -m workflows.batch",
+        description="Generate ad sets for every SKU in a CSV or JSONL manifest."
+    )
+    parser.add_argument("manifest", help="CSV or JSONL manifest with sku, image and/or prompt columns")
+    parser.add_argument("--out", default="output", help="Output directory (default: output)")
+    parser.add_argument("--workers", type=int, default=4, help="SKUs processed concurrently (default: 4)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="SKUs queued or running at once (default: 2 x workers)")
+    parser.add_argument("--config", default=None, help="JSON file with config applied to every row")
+    parser.add_argument("--result-timeout", type=float, default=300,
+                        help="Seconds to wait for async results of a stage (default: 300)")
+    parser.add_argument("--journal", default=None,
+                        help="SQLite run journal used to resume the run (default: OUT/journal.sqlite)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore earlier progress in the journal and process every row again")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("BRIA_API_KEY")
+    if not api_key:
+        parser.error("BRIA_API_KEY is not set")
+
+    base_config = None
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            base_config = json.load(f)
+
+    summary = run_batch(args.manifest, args.out, api_key, workers=args.workers,
+                        max_pending=args.max_pending, base_config=base_config,
+                        result_timeout=args.result_timeout, journal_path=args.journal,
+                        fresh=args.fresh)
+    print(f"{summary['rows']} SKUs in {summary['elapsed_s']}s "
+          f"({summary['skus_per_minute']} SKUs/min): {summary['succeeded']} succeeded, "
+          f"{summary['partial']} partial, {summary['failed']} failed, "
+          f"{summary['skipped']} already done")
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
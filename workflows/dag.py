@@ -0,0 +1,239 @@
+from typing import Dict, Any, Optional, List, Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+import contextvars
+import logging
+import time
+from services.log import get_logger, log_event
+from services.tracing import span
+
+logger = get_logger("workflow")
+
+# Stage outcomes
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+SKIPPED = "skipped"
+
+
+class Stage:
+    """
+    One step of a workflow graph.
+
+    Args:
+        name: Unique stage name; also the key of its result
+        run: Function called with a dict of its dependencies' results
+        depends_on: Names of stages whose results this stage needs
+        timeout: Seconds after which the stage is abandoned (None: no limit)
+        optional: Whether the workflow carries on when this stage fails
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Any],
+        depends_on: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        optional: bool = False
+    ):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.optional = optional
+
+
+class DagRun:
+    """Outcome of running a stage graph: results of the stages that succeeded plus per-stage status."""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+        self.failed = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'status': dict(self.status),
+            'errors': dict(self.errors),
+            'durations': dict(self.durations),
+            'failed': self.failed
+        }
+
+
+class StageEvent:
+    """
+    Completion of one stage, as yielded by DagExecutor.iter_run.
+
+    Args:
+        name: Stage name
+        status: SUCCEEDED, FAILED, TIMED_OUT or SKIPPED
+        result: Return value of the stage (None unless it succeeded)
+        error: Reason the stage did not succeed
+        elapsed: Seconds the stage ran
+    """
+
+    __slots__ = ('name', 'status', 'result', 'error', 'elapsed')
+
+    def __init__(self, name: str, status: str, result: Any = None, error: Optional[str] = None, elapsed: float = 0.0):
+        self.name = name
+        self.status = status
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return f"<StageEvent {self.name} {self.status}>"
+
+
+def _topological_order(stages: List[Stage]) -> List[Stage]:
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {dependency}")
+
+    ordered, visiting, visited = [], set(), set()
+
+    def visit(stage: Stage) -> None:
+        if stage.name in visited:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Dependency cycle through stage {stage.name}")
+        visiting.add(stage.name)
+        for dependency in stage.depends_on:
+            visit(by_name[dependency])
+        visiting.discard(stage.name)
+        visited.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+class DagExecutor:
+    """
+    Runs a graph of stages, starting each one as soon as its dependencies succeed.
+
+    Independent stages run concurrently on a thread pool, so the wall-clock
+    time approaches the longest dependency chain rather than the sum of all
+    stages. A stage that fails or exceeds its timeout gets no result and its
+    dependents are skipped; the other branches carry on. When a required
+    (non-optional) stage fails, no new stages are started and the run is
+    marked failed. Either way the results gathered so far are returned.
+
+    A timed-out stage cannot be interrupted: its thread is abandoned and its
+    late result discarded.
+
+    Args:
+        max_workers: Maximum concurrently running stages (default: one per stage)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _run_stage(stage: Stage, inputs: Dict[str, Any]) -> Any:
+        with span(f"stage.{stage.name}"):
+            return stage.run(inputs)
+
+    def _record_failure(self, run: DagRun, stage: Stage, status: str, error: str, elapsed: float) -> StageEvent:
+        run.status[stage.name] = status
+        run.errors[stage.name] = error
+        run.durations[stage.name] = elapsed
+        if not stage.optional:
+            run.failed = True
+        log_event(logger, logging.WARNING, "stage_failed", stage=stage.name, status=status,
+                  optional=stage.optional, error=error, latency_ms=round(elapsed * 1000, 1))
+        return StageEvent(stage.name, status, error=error, elapsed=elapsed)
+
+    def iter_run(self, stages: List[Stage], run: Optional[DagRun] = None) -> Iterator[StageEvent]:
+        """
+        Run `stages` and yield a StageEvent as each one finishes, fails or is skipped.
+
+        Events arrive in completion order, so a caller can use each result
+        while slower stages are still running. Progress is also recorded in
+        `run` when given.
+        """
+        pending = _topological_order(stages)
+        run = run if run is not None else DagRun()
+        if not pending:
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers or len(pending),
+                                  thread_name_prefix="workflow-stage")
+        running: Dict[Future, tuple] = {}
+        try:
+            while pending or running:
+                # Stages are in dependency order, so one pass propagates skips down the graph
+                waiting = []
+                for stage in pending:
+                    blocked = [d for d in stage.depends_on if run.status.get(d, SUCCEEDED) != SUCCEEDED]
+                    if run.failed or blocked:
+                        run.status[stage.name] = SKIPPED
+                        run.errors[stage.name] = (f"Skipped: stage {blocked[0]} did not succeed"
+                                                  if blocked else "Skipped: a required stage failed")
+                        yield StageEvent(stage.name, SKIPPED, error=run.errors[stage.name])
+                    elif all(d in run.results for d in stage.depends_on):
+                        inputs = {d: run.results[d] for d in stage.depends_on}
+                        # Each stage runs in a copy of the caller's context to join its trace
+                        ctx = contextvars.copy_context()
+                        future = pool.submit(ctx.run, self._run_stage, stage, inputs)
+                        running[future] = (stage, time.monotonic())
+                    else:
+                        waiting.append(stage)
+                pending = waiting
+                if not running:
+                    break
+
+                now = time.monotonic()
+                deadlines = [started + stage.timeout for stage, started in running.values()
+                             if stage.timeout is not None]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                now = time.monotonic()
+                for future in done:
+                    stage, started = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield self._record_failure(run, stage, FAILED, str(e), now - started)
+                        continue
+                    run.results[stage.name] = result
+                    run.status[stage.name] = SUCCEEDED
+                    run.durations[stage.name] = now - started
+                    yield StageEvent(stage.name, SUCCEEDED, result=result, elapsed=now - started)
+
+                for future, (stage, started) in list(running.items()):
+                    if stage.timeout is not None and now - started >= stage.timeout:
+                        del running[future]
+                        future.cancel()
+                        yield self._record_failure(run, stage, TIMED_OUT,
+                                                   f"Timed out after {stage.timeout:g}s", now - started)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, stages: List[Stage]) -> DagRun:
+        """Run `stages` to completion and return their results and status."""
+        run = DagRun()
+        for _ in self.iter_run(stages, run):
+            pass
+        return run
+
+
+__all__ = [
+    'Stage',
+    'DagRun',
+    'StageEvent',
+    'DagExecutor',
+    'SUCCEEDED',
+    'FAILED',
+    'TIMED_OUT',
+    'SKIPPED'
+]
@@ -1,63 +1,247 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union, List, Iterator, Sequence
+import hashlib
+import json
 from services.init import (
     lifestyle_shot_by_text,
     add_shadow,
     create_packshot,
-    generate_hd_image
+    generate_hd_image,
+    first_result_url,
+    result_urls,
+    ImageSource
 )
+from services.tracing import traced
+from workflows.dag import Stage, DagExecutor, SUCCEEDED
 
-def generate_ad_set(
-    api_key: str,
-    image: Optional[bytes] = None,
+# Ad set settings; the sidebar and batch manifests override these keys
+DEFAULT_CONFIG = {
+    "create_packshot": False,
+    "add_shadow": False,
+    "lifestyle_shot": False,
+    "background_color": "#FFFFFF",
+    "shadow_type": "natural",
+    "scene_description": "",
+    "num_results": 1,
+    "aspect_ratio": "1:1",
+    "sync": True,
+    "optimize_uploads": False,
+}
+
+# Stages that may fail without stopping the rest of the ad set
+OPTIONAL_STAGES = ("packshot", "shadow", "lifestyle")
+
+# Config keys each stage's output depends on
+STAGE_CONFIG_KEYS = {
+    "hd_image": ("num_results", "aspect_ratio", "sync"),
+    "packshot": ("background_color", "optimize_uploads"),
+    "shadow": ("shadow_type", "optimize_uploads"),
+    "lifestyle": ("scene_description", "num_results", "optimize_uploads"),
+}
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def stage_fingerprints(
+    source: Optional[str],
     prompt: Optional[str] = None,
     config: Dict[str, Any] = None
-) -> Dict[str, Any]:
+) -> Dict[str, str]:
     """
-    Generate a set of product ads based on configuration.
+    Return a fingerprint per stage of the inputs that determine its output.
+
+    A stage's fingerprint covers its source image (or, for images generated
+    from a prompt, the HD image stage's fingerprint) and the config keys in
+    STAGE_CONFIG_KEYS, so a recorded result may only be reused while its
+    fingerprint is unchanged.
+
+    Args:
+        source: Identity of the input image, e.g. its content hash or URL
+            (None when the image is generated from `prompt`)
+        prompt: Prompt for the HD image stage
+        config: Ad set config (missing keys take DEFAULT_CONFIG values)
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    def fingerprint(stage: str, **inputs: Any) -> str:
+        return _digest({'stage': stage, **inputs,
+                        'config': {key: config.get(key) for key in STAGE_CONFIG_KEYS[stage]}})
+
+    fingerprints = {}
+    if prompt and not source:
+        fingerprints["hd_image"] = fingerprint("hd_image", prompt=prompt)
+        source = f"hd_image:{fingerprints['hd_image']}"
+    for stage in OPTIONAL_STAGES:
+        fingerprints[stage] = fingerprint(stage, source=source)
+    return fingerprints
+
+
+def _source_from(inputs: Dict[str, Any], source: Optional[ImageSource]) -> ImageSource:
+    """Return the image a stage works on: the upload, or the generated HD image."""
+    if "hd_image" in inputs:
+        hd_url = first_result_url(inputs["hd_image"])
+        if hd_url:
+            return ImageSource(url=hd_url)
+        raise ValueError("HD image generation returned no image URL")
+    return source
+
+
+def _replays(name: str, depends_on: Sequence[str], completed: Dict[str, Any]) -> bool:
+    """Whether a stage returns its recorded response: only while its inputs are replayed too."""
+    return name in completed and all(d in completed for d in depends_on)
+
+
+def build_ad_set_stages(
+    api_key: str,
+    image: Optional[Union[bytes, str]] = None,
+    prompt: Optional[str] = None,
+    config: Dict[str, Any] = None,
+    completed: Optional[Dict[str, Any]] = None
+) -> List[Stage]:
+    """
+    Build the stage graph of an ad set.
+
+    Packshot, shadow and lifestyle only depend on the source image, so they
+    can run concurrently; when the source is generated from a prompt they
+    all depend on the HD image stage.
+
+    Timeouts come from `config["stage_timeouts"]` (per stage name) or
+    `config["stage_timeout"]`; `config["required_stages"]` overrides which
+    stages stop the workflow when they fail (default: only hd_image).
+
+    Stages named in `completed` (stage -> API response from an earlier run)
+    are not called again: they return the recorded response, which their
+    dependents use as before. A stage whose dependency is not in
+    `completed` runs again, since its input is a new result.
     """
     if not config:
         config = {}
-    
-    result = {}
-    
+
+    source = ImageSource.from_value(image) if image else None
+    optimize_upload = config.get("optimize_uploads", False)
+    timeouts = config.get("stage_timeouts", {})
+    required = config.get("required_stages")
+    completed = completed or {}
+    stages = []
+
+    def add(name: str, run, depends_on=()):
+        if _replays(name, depends_on, completed):
+            run = lambda inputs, response=completed[name]: response
+        stages.append(Stage(
+            name,
+            run,
+            depends_on=depends_on,
+            timeout=timeouts.get(name, config.get("stage_timeout")),
+            optional=name not in required if required is not None else name in OPTIONAL_STAGES
+        ))
+
     # Generate HD image if prompt provided
+    depends_on = ()
     if prompt and not image:
-        hd_response = generate_hd_image(
+        add("hd_image", lambda inputs: generate_hd_image(
             api_key=api_key,
             prompt=prompt,
             num_results=config.get("num_results", 1),
             aspect_ratio=config.get("aspect_ratio", "1:1"),
             sync=config.get("sync", True)
-        )
-        result["hd_image"] = hd_response
-        image = hd_response.get("result_url")
-    
+        ))
+        depends_on = ("hd_image",)
+    elif not source:
+        return stages
+
     # Create packshot if requested
-    if config.get("create_packshot", False) and image:
-        packshot_response = create_packshot(
+    if config.get("create_packshot", False):
+        add("packshot", lambda inputs: create_packshot(
             api_key=api_key,
-            image_data=image,
-            background_color=config.get("background_color", "#FFFFFF")
-        )
-        result["packshot"] = packshot_response
-    
+            background_color=config.get("background_color", "#FFFFFF"),
+            optimize_upload=optimize_upload,
+            **_source_from(inputs, source).kwargs()
+        ), depends_on)
+
     # Add shadow if requested
-    if config.get("add_shadow", False) and image:
-        shadow_response = add_shadow(
+    if config.get("add_shadow", False):
+        add("shadow", lambda inputs: add_shadow(
             api_key=api_key,
-            image_data=image,
-            shadow_type=config.get("shadow_type", "natural")
-        )
-        result["shadow"] = shadow_response
-    
+            shadow_type=config.get("shadow_type", "natural"),
+            optimize_upload=optimize_upload,
+            **_source_from(inputs, source).kwargs()
+        ), depends_on)
+
     # Create lifestyle shot if requested
-    if config.get("lifestyle_shot", False) and image:
-        lifestyle_response = lifestyle_shot_by_text(
-            api_key=api_key,
-            image_data=image,
-            scene_description=config.get("scene_description", ""),
-            num_results=config.get("num_results", 1)
-        )
-        result["lifestyle"] = lifestyle_response
-    
-    return result 
\ No newline at end of file
+    if config.get("lifestyle_shot", False):
+        def lifestyle(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            lifestyle_kwargs = _source_from(inputs, source).kwargs()
+            return lifestyle_shot_by_text(
+                api_key=api_key,
+                image_data=lifestyle_kwargs.get("image_data"),
+                image_url=lifestyle_kwargs.get("image_url"),
+                scene_description=config.get("scene_description", ""),
+                num_results=config.get("num_results", 1),
+                optimize_upload=optimize_upload
+            )
+        add("lifestyle", lifestyle, depends_on)
+
+    return stages
+
+
+@traced("generate_ad_set")
+def generate_ad_set(
+    api_key: str,
+    image: Optional[Union[bytes, str]] = None,
+    prompt: Optional[str] = None,
+    config: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """
+    Generate a set of product ads based on configuration.
+
+    `image` may be raw bytes or the URL of a hosted image. Stages are chained
+    by hosted URL, so a generated HD image is never downloaded and uploaded
+    again for the following stages. Independent stages run concurrently,
+    each in its own tracing span under one trace.
+
+    If a stage fails or times out, the results of the other stages are
+    still returned and `result["errors"]` maps stage names to the reason.
+    """
+    run = DagExecutor().run(build_ad_set_stages(api_key, image, prompt, config))
+
+    result = dict(run.results)
+    if run.errors:
+        result["errors"] = run.errors
+    return result
+
+
+def iter_ad_set(
+    api_key: str,
+    image: Optional[Union[bytes, str]] = None,
+    prompt: Optional[str] = None,
+    config: Dict[str, Any] = None,
+    completed: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of generate_ad_set that yields each stage as it completes.
+
+    Takes the same arguments as generate_ad_set. Each event is a dict with
+    the stage name, its status, the API response (`result`), the result
+    image URLs found in it (`urls`; for async requests these are the job
+    URLs still being rendered), the error if it did not succeed, and the
+    elapsed seconds. Events arrive in completion order, so the packshot can
+    be shown while the lifestyle shot is still rendering.
+
+    `completed` maps stages that already succeeded in an earlier run to
+    their responses (see build_ad_set_stages); their events have
+    `replayed` set and cost no API call.
+    """
+    completed = completed or {}
+    stages = build_ad_set_stages(api_key, image, prompt, config, completed)
+    replayed = {stage.name for stage in stages if _replays(stage.name, stage.depends_on, completed)}
+    for event in DagExecutor().iter_run(stages):
+        yield {
+            'stage': event.name,
+            'status': event.status,
+            'result': event.result,
+            'urls': result_urls(event.result) if event.status == SUCCEEDED else [],
+            'error': event.error,
+            'elapsed': event.elapsed,
+            'replayed': event.name in replayed
+        }
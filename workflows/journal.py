@@ -0,0 +1,155 @@
+from typing import Dict, Any, Optional, List, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    sku TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    fingerprint TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    sku TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    fingerprint TEXT,
+    response TEXT,
+    urls TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (sku, stage)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sku TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (sku, stage, url)
+);
+"""
+
+
+class RunJournal:
+    """
+    Durable record of a batch run in SQLite, used to resume it after a crash.
+
+    Every SKU x stage outcome is written as soon as it is known, with the
+    fingerprint of the inputs that produced it (see stage_fingerprints), the
+    API response and result URLs of successful stages, and every saved
+    result image with its path and SHA-256. A restarted run skips SKUs that
+    finished with the same inputs, replays the responses of stages that
+    already succeeded with a matching fingerprint instead of paying for them
+    again, and re-runs failed, missing or changed stages.
+
+    Recorded responses are only replayed for `max_age` seconds: they carry
+    hosted result URLs that later stages fetch and that eventually expire.
+
+    The database uses WAL mode, and writes from worker threads are
+    serialized on one connection.
+
+    Args:
+        path: SQLite database file
+        max_age: Maximum age in seconds of a stage response that is replayed
+    """
+
+    def __init__(self, path: str, max_age: float = 24 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Journals written before fingerprints were recorded never match one
+        for table in ("rows", "stages"):
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "fingerprint" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN fingerprint TEXT")
+        self._conn.commit()
+
+    def _write(self, sql: str, params: Tuple) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def _read(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def finished_skus(self) -> Dict[str, Optional[str]]:
+        """Return {sku: row fingerprint} of the SKUs whose every stage and result image completed."""
+        return dict(self._read("SELECT sku, fingerprint FROM rows WHERE status = 'succeeded'"))
+
+    def completed_stages(self, sku: str, fingerprints: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Return {stage: API response} of the stages of `sku` that already succeeded.
+
+        Only stages recorded with the fingerprint given for them in
+        `fingerprints` and less than `max_age` seconds ago are returned;
+        others must run again.
+        """
+        rows = self._read("SELECT stage, fingerprint, response FROM stages "
+                          "WHERE sku = ? AND status = 'succeeded' AND updated >= ?",
+                          (sku, time.time() - self.max_age))
+        return {stage: json.loads(response) for stage, fingerprint, response in rows
+                if fingerprint is not None and fingerprint == fingerprints.get(stage)}
+
+    def blobs(self, sku: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Return {(stage, url): {'path', 'sha256', 'size'}} of the result images saved for `sku`."""
+        rows = self._read("SELECT stage, url, path, sha256, size FROM blobs WHERE sku = ?", (sku,))
+        return {(stage, url): {'path': path, 'sha256': sha256, 'size': size}
+                for stage, url, path, sha256, size in rows}
+
+    def record_stage(
+        self,
+        sku: str,
+        stage: str,
+        status: str,
+        fingerprint: Optional[str] = None,
+        response: Any = None,
+        urls: Optional[List[str]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Record the outcome of one stage of `sku`, counting attempts across runs."""
+        self._write(
+            "INSERT INTO stages (sku, stage, status, fingerprint, response, urls, error, attempts, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (sku, stage) DO UPDATE SET status = excluded.status, "
+            "fingerprint = excluded.fingerprint, response = excluded.response, "
+            "urls = excluded.urls, error = excluded.error, attempts = stages.attempts + 1, "
+            "updated = excluded.updated",
+            (sku, stage, status, fingerprint,
+             json.dumps(response, default=str) if response is not None else None,
+             json.dumps(urls or []), error, time.time())
+        )
+
+    def record_blob(self, sku: str, stage: str, url: str, path: str, sha256: str, size: int) -> None:
+        """Record a result image saved to `path`."""
+        self._write(
+            "INSERT OR REPLACE INTO blobs (sku, stage, url, path, sha256, size) VALUES (?, ?, ?, ?, ?, ?)",
+            (sku, stage, url, path, sha256, size)
+        )
+
+    def record_row(self, sku: str, status: str, fingerprint: Optional[str] = None) -> None:
+        """Record the overall status of a SKU and the fingerprint of its inputs."""
+        self._write("INSERT OR REPLACE INTO rows (sku, status, fingerprint, updated) VALUES (?, ?, ?, ?)",
+                    (sku, status, fingerprint, time.time()))
+
+    def clear(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._conn.executescript("DELETE FROM rows; DELETE FROM stages; DELETE FROM blobs;")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ['RunJournal']